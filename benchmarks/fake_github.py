@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from collections import Counter
+from dataclasses import dataclass, field
+import base64
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+ALIAS = re.compile(r'(r\d+): repository\(owner: ("[^"]*"), name: ("[^"]*")\)')
+WORDS = "model agent server client stream cache index query build deploy".split()
+
+
+def fake_readme(name: str, paragraphs: int = 20) -> str:
+    """A deterministic README of `name`, with badges and code like real ones."""
+    rng = random.Random(name)
+    lines = [
+        f"# {name}",
+        f"[![build](https://img.shields.io/badge/{name}-passing-green)](#)",
+    ]
+    for i in range(paragraphs):
+        lines.append(f"## Section {i}")
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(60)))
+        if i % 5 == 0:
+            lines.append(f"```bash\npip install {name.split('/')[-1]}\n```")
+    return "\n\n".join(lines)
+
+
+@dataclass
+class FakeGithub:
+    """A local stand-in for the GitHub and Feishu endpoints the pipeline uses.
+
+    It serves the REST contents/readme API with ETags, the starred list with
+    pagination, GraphQL repository aliases, rate-limit headers and a Feishu
+    bot webhook, and counts every request by kind. Start it with `start()`
+    and point `GithubAPI.base_url` and `FeishuAPI.bot_webhook` at `url`.
+
+    Attributes:
+        trending: The trending file served for `uglyboy-tl/Data`.
+        starred: The full names of the starred repos.
+        latency: The seconds every response is delayed.
+        readme_paragraphs: The size of the generated READMEs.
+    """
+
+    trending: str = ""
+    starred: List[str] = field(default_factory=list)
+    latency: float = 0.05
+    readme_paragraphs: int = 20
+    requests: Counter = field(init=False, default_factory=Counter)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self._server, "call start() first"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGithub":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                fake._handle(self, "GET")
+
+            def do_POST(self):
+                fake._handle(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, kind: str) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        time.sleep(self.latency)
+        parsed = urlparse(handler.path)
+        parts = parsed.path.strip("/").split("/")
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        if method == "POST" and parts == ["graphql"]:
+            self._count("graphql")
+            return self._send(handler, 200, self._graphql(json.loads(body)["query"]))
+        if method == "POST" and parts == ["feishu"]:
+            self._count("feishu")
+            return self._send(handler, 200, {"code": 0, "msg": "success"})
+        if parts[:1] == ["users"] and parts[2:] == ["starred"]:
+            self._count("starred")
+            return self._starred(handler, parsed.query)
+        if parts[:1] == ["repos"] and len(parts) >= 4:
+            name = "/".join(parts[1:3])
+            if parts[3] == "readme":
+                self._count("readme")
+                return self._content(handler, fake_readme(name, self.readme_paragraphs))
+            if parts[3] == "contents" and name == "uglyboy-tl/Data":
+                self._count("contents")
+                return self._content(handler, self.trending)
+        self._count("other")
+        self._send(handler, 404, {"message": "Not Found"})
+
+    def _graphql(self, query: str) -> dict:
+        data = {}
+        # 只查 oid 的查询不返回正文
+        with_text = "oid text" in query
+        for alias, owner, repo in ALIAS.findall(query):
+            name = f"{json.loads(owner)}/{json.loads(repo)}"
+            readme = fake_readme(name, self.readme_paragraphs)
+            data[alias] = {
+                "nameWithOwner": name,
+                "description": "",
+                "stargazerCount": 0,
+                "repositoryTopics": {"nodes": []},
+                "readme": {"oid": sha1(readme.encode()).hexdigest(), "text": readme},
+            }
+            if not with_text:
+                del data[alias]["readme"]["text"]
+        return {"data": data}
+
+    def _starred(self, handler: BaseHTTPRequestHandler, query: str) -> None:
+        params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+        page = int(params.get("page", 1))
+        per_page = int(params.get("per_page", 30))
+        stars = self.starred[(page - 1) * per_page : page * per_page]
+        items = [
+            {"starred_at": f"2024-01-{i % 28 + 1:02d}T00:00:00Z", "repo": {"full_name": n}}
+            for i, n in enumerate(stars)
+        ]
+        headers = {}
+        if page * per_page < len(self.starred):
+            path = urlparse(handler.path).path
+            headers["Link"] = (
+                f'<{self.url}{path}?per_page={per_page}&page={page + 1}>; rel="next"'
+            )
+        self._send(handler, 200, items, headers)
+
+    def _content(self, handler: BaseHTTPRequestHandler, content: str) -> None:
+        sha = sha1(content.encode()).hexdigest()
+        etag = f'"{sha}"'
+        if handler.headers.get("If-None-Match") == etag:
+            return self._send(handler, 304, None, {"ETag": etag})
+        payload = {
+            "sha": sha,
+            "encoding": "base64",
+            "content": base64.b64encode(content.encode()).decode(),
+        }
+        self._send(handler, 200, payload, {"ETag": etag})
+
+    def _send(
+        self,
+        handler: BaseHTTPRequestHandler,
+        status: int,
+        payload,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        body = b"" if payload is None else json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.send_header("X-RateLimit-Limit", "5000")
+        handler.send_header("X-RateLimit-Remaining", "4999")
+        handler.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(body)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass
+from hashlib import sha256
+import json
+import multiprocessing
+import random
+import re
+import time
+from typing import Any, Callable, ClassVar, List, Optional, Type, Union
+
+from pydantic import BaseModel
+from uglychain import Model
+from uglychain.llm import BaseLanguageModel
+
+from uglygpt.utils import count_tokens
+
+WORDS = "模型 项目 支持 数据 服务 框架 agent api llm cache stream index".split()
+HEADING = re.compile(r"^### ", re.MULTILINE)
+
+# MapChain 在子进程里调用模型，计数放在 fork 之前创建的共享内存里
+_STATS = multiprocessing.Array("q", 3)
+
+
+@dataclass
+class FakeLLM(BaseLanguageModel):
+    """A deterministic, offline language model for benchmarks.
+
+    The answer depends only on the prompt. Structured answers are generated
+    from the JSON schema of the response model, with one array item per
+    `### ` heading of the prompt and `index` fields numbered from 1, which
+    fits the batched prompts. Each call sleeps `latency` seconds plus the
+    answer length divided by `tokens_per_second`.
+    """
+
+    MAX_TOKENS: int = 16384
+    name: str = "FAKE"
+    latency: ClassVar[float] = 0.2
+    tokens_per_second: ClassVar[float] = 200
+    answer_tokens: ClassVar[int] = 150
+
+    def generate(
+        self,
+        prompt: str = "",
+        response_model: Optional[Type[BaseModel]] = None,
+        tools: Optional[List[Callable]] = None,
+        stop: Union[Optional[str], List[str]] = None,
+    ) -> str:
+        rng = random.Random(sha256(prompt.encode("utf-8")).digest())
+        if response_model is None:
+            answer = self._text(rng, self.answer_tokens)
+        else:
+            schema = response_model.model_json_schema()
+            items = max(1, len(HEADING.findall(prompt)))
+            answer = json.dumps(
+                self._value(schema, schema, rng, items), ensure_ascii=False
+            )
+        completion = count_tokens(answer)
+        time.sleep(self.latency + completion / self.tokens_per_second)
+        with _STATS.get_lock():
+            _STATS[0] += 1
+            _STATS[1] += count_tokens((self.system_prompt or "") + prompt)
+            _STATS[2] += completion
+        return answer
+
+    def parse_response(self, response: str, response_model: Type[BaseModel]) -> Any:
+        return response_model.model_validate_json(response)
+
+    def completion_with_backoff(self, **kwargs):
+        # 与真实接口一样接收 messages，走同一条生成路径
+        prompt = "\n".join(
+            str(message.get("content", ""))
+            for message in kwargs.get("messages", [])
+            if message.get("role") != "system"
+        )
+        return self.generate(prompt, kwargs.get("response_model"))
+
+    def _create_client(self):
+        return None
+
+    @property
+    def max_tokens(self) -> int:
+        return self.MAX_TOKENS
+
+    @staticmethod
+    def _text(rng: random.Random, tokens: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+    def _value(
+        self,
+        schema: dict,
+        root: dict,
+        rng: random.Random,
+        items: int,
+        index: int = 1,
+        name: str = "",
+    ) -> Any:
+        if "$ref" in schema:
+            schema = root["$defs"][schema["$ref"].split("/")[-1]]
+        elif "allOf" in schema:
+            schema = root["$defs"][schema["allOf"][0]["$ref"].split("/")[-1]]
+        if "enum" in schema:
+            return rng.choice(schema["enum"])
+        kind = schema.get("type", "string")
+        if kind == "object":
+            return {
+                key: self._value(value, root, rng, items, index, key)
+                for key, value in schema.get("properties", {}).items()
+            }
+        if kind == "array":
+            return [
+                self._value(schema.get("items", {}), root, rng, 1, i)
+                for i in range(1, items + 1)
+            ]
+        if kind == "integer":
+            return index if name == "index" else rng.randint(0, 100)
+        if kind == "number":
+            return rng.random()
+        if kind == "boolean":
+            return rng.random() < 0.5
+        return self._text(rng, 20)
+
+
+@dataclass
+class FakeLLMStats:
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+
+
+def stats() -> FakeLLMStats:
+    """Returns the totals of every `FakeLLM` call, child processes included."""
+    with _STATS.get_lock():
+        return FakeLLMStats(*_STATS[:])
+
+
+class FakeModel(Model):
+    FAKE = (FakeLLM, {"model": "fake", "MAX_TOKENS": 16384})
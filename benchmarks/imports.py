@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+"""Import-time benchmark of the uglygpt entry points, in fresh interpreters.
+
+Each module is imported `--repeat` times in a new process, and the best time
+of the import itself is reported with the heavy dependencies it loaded:
+
+    python -m benchmarks.imports --repeat 10
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from typing import List, Tuple
+
+MODULES = [
+    "uglygpt.utils",
+    "uglygpt.utilities",
+    "uglygpt.worker.github",
+    "uglygpt.worker.code",
+    "uglygpt.obsidian",
+]
+HEAVY = ["uglychain", "openai", "pydantic", "requests", "tenacity", "llama_index"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps([seconds, [m for m in {heavy!r} if m in sys.modules]]))
+"""
+
+
+def probe(statement: str) -> Tuple[float, List[str]]:
+    """Runs `statement` in a fresh interpreter, returns its time and imports."""
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    seconds, loaded = json.loads(out.splitlines()[-1])
+    return seconds, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per module")
+    args = parser.parse_args()
+
+    print(f"{'module':<26}{'import ms':>12}  heavy dependencies loaded")
+    for module in args.modules:
+        runs = [probe(f"import {module}") for _ in range(args.repeat)]
+        seconds = min(s for s, _ in runs)
+        loaded = runs[-1][1]
+        print(f"{module:<26}{seconds * 1000:>12.1f}  {', '.join(loaded) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
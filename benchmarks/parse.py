@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+"""Micro-benchmarks of `uglygpt.utils.parse` on large synthetic inputs.
+
+Each parser is timed against the regex version it replaced:
+
+    python -m benchmarks.parse --size 200 --repeat 20
+"""
+
+import argparse
+import random
+import re
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from uglygpt.utils.parse import parse_code, parse_markdown, parse_trending
+
+LANGUAGES = ["All Languages", "Python", "Typescript", "Rust", "Go", "Html", "Css"]
+WORDS = "the model agent server token stream cache index parse query build test".split()
+
+
+def _sentence(rng: random.Random, n: int = 12) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def llm_output(size: int, seed: int = 0) -> str:
+    """An answer with `size` paragraphs of chatter around a python block."""
+    rng = random.Random(seed)
+    prose = "\n\n".join(_sentence(rng, 40) for _ in range(size))
+    code = "\n".join(
+        f"    value_{i} = compute({i}, '{rng.choice(WORDS)}')  # {_sentence(rng, 4)}"
+        for i in range(size * 5)
+    )
+    return f"{prose}\n\n```python\ndef main():\n{code}\n```\n\n{prose}\n"
+
+
+def markdown_report(size: int, seed: int = 0) -> str:
+    """A report with `size` sections of summaries, like `output_markdown`."""
+    rng = random.Random(seed)
+    sections = []
+    for i in range(size):
+        lines = "\n".join(f"> {_sentence(rng)}" for _ in range(20))
+        sections.append(f"## Section {i}\n\n- [x] [owner/repo{i}](url)\n\n{lines}\n")
+    return "\n".join(sections)
+
+
+def trending_file(size: int, seed: int = 0) -> str:
+    """A trending file with `size` repos in each language."""
+    rng = random.Random(seed)
+    sections = []
+    for language in LANGUAGES:
+        owner = language.lower().replace(" ", "-")
+        repos = "\n".join(
+            f"- [{owner}/repo{i}](https://github.com/{owner}/repo{i}) - {_sentence(rng)}"
+            for i in range(size)
+        )
+        sections.append(f"## {language}\n\n{repos}\n")
+    return "\n".join(sections)
+
+
+def legacy_parse_code(text: str, lang: str = "python") -> str:
+    match = re.search(rf"```{lang}.*?\s+(.*)\s+```", text, re.DOTALL)
+    if match:
+        return match.group(1)
+    pattern = r"```.*?\s+(.*)\s+```"
+    match = re.search(pattern, text, re.DOTALL)
+    if match:
+        return match.group(1)
+    match = re.search(pattern, text + "\n```", re.DOTALL)
+    if match:
+        return match.group(1)
+    raise Exception(f"{pattern} not match following text:\n{text}")
+
+
+def legacy_parse_markdown(markdown_text: str) -> Dict[str, str]:
+    pattern = r"(?m)^## (.*?)\n(.*?)(?=^## |\Z)"
+    matches = re.findall(pattern, markdown_text, re.DOTALL)
+    return {title: text.strip() for title, text in matches}
+
+
+def legacy_parse_trending(markdown_text: str) -> Dict[str, List[Tuple[str, str]]]:
+    result = {}
+    for language in LANGUAGES:
+        section = re.search(
+            rf"## {language}\n\n(.*?)(?=\n## |\Z)", markdown_text, re.DOTALL
+        )
+        if section:
+            result[language] = re.findall(
+                r"-\s\[(.*?)\]\((.*?)\)\s-\s(.*)", section.group(1)
+            )
+    return result
+
+
+def cases(size: int) -> List[Tuple[str, Callable, Callable, str]]:
+    return [
+        ("parse_code", legacy_parse_code, parse_code, llm_output(size)),
+        ("parse_markdown", legacy_parse_markdown, parse_markdown, markdown_report(size)),
+        (
+            "parse_trending",
+            legacy_parse_trending,
+            # 去掉内容缓存，只比较解析本身
+            parse_trending.__wrapped__,
+            trending_file(size),
+        ),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200, help="input scale")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per case")
+    args = parser.parse_args()
+
+    print(f"{'case':<16}{'input':>10}{'legacy ms':>12}{'current ms':>12}{'speedup':>9}")
+    for name, legacy, current, text in cases(args.size):
+        old = min(timeit.repeat(lambda: legacy(text), number=1, repeat=args.repeat))
+        new = min(timeit.repeat(lambda: current(text), number=1, repeat=args.repeat))
+        print(
+            f"{name:<16}{len(text):>10}{old * 1000:>12.3f}{new * 1000:>12.3f}"
+            f"{old / new:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
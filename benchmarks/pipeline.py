@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+"""End-to-end benchmark of the trending pipeline and Coder, fully offline.
+
+GitHub and Feishu are served by `FakeGithub` and the LLM is `FakeModel.FAKE`,
+so the numbers only depend on this code and the configured latencies:
+
+    python -m benchmarks.pipeline --trending trending.md --rounds 2
+"""
+
+import argparse
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+import os
+from pathlib import Path
+import sys
+import tempfile
+import time
+from typing import Iterator, List
+
+from loguru import logger
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from benchmarks import fake_llm
+from benchmarks.fake_github import FakeGithub
+from benchmarks.fake_llm import FakeLLM, FakeModel
+from benchmarks.parse import trending_file
+from uglygpt.utils import File, parse_trending
+
+REQUEST = "写一个命令行工具，统计一个目录下各类文件的数量和总大小。"
+
+
+@dataclass
+class Stage:
+    name: str
+    seconds: float
+    requests: int
+    llm_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    peak_rss_mb: float
+
+
+def peak_rss_mb() -> float:
+    """The peak RSS of this process or its largest child so far, in MB."""
+    if resource is None:
+        return 0.0
+    rss = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Linux 上单位是 KB，macOS 上是字节
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+@contextmanager
+def measure(name: str, github: FakeGithub, stages: List[Stage]) -> Iterator[None]:
+    requests = sum(github.requests.values())
+    llm = fake_llm.stats()
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    after = fake_llm.stats()
+    stages.append(
+        Stage(
+            name=name,
+            seconds=seconds,
+            requests=sum(github.requests.values()) - requests,
+            llm_calls=after.calls - llm.calls,
+            prompt_tokens=after.prompt_tokens - llm.prompt_tokens,
+            completion_tokens=after.completion_tokens - llm.completion_tokens,
+            peak_rss_mb=peak_rss_mb(),
+        )
+    )
+
+
+def report(stages: List[Stage]) -> None:
+    names = [f.name for f in fields(Stage)]
+    print("".join(f"{n:>18}" for n in names))
+    for stage in stages:
+        print(
+            "".join(
+                f"{v:>18.2f}" if isinstance(v, float) else f"{v:>18}"
+                for v in (getattr(stage, n) for n in names)
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trending", help="a recorded trending file to replay")
+    parser.add_argument("--size", type=int, default=10, help="synthetic repos per language")
+    parser.add_argument("--rounds", type=int, default=1, help="runs over the same workspace")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tps", type=float, default=200, help="LLM tokens per second")
+    parser.add_argument("--github-latency", type=float, default=0.05)
+    parser.add_argument("--no-coder", action="store_true", help="skip the Coder stage")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logger.remove()
+        logger.add(sys.stderr, level="WARNING")
+    trending = (
+        Path(args.trending).read_text() if args.trending else trending_file(args.size)
+    )
+    repos = [r.name for rs in parse_trending(trending).values() for r in rs]
+    FakeLLM.latency = args.llm_latency
+    FakeLLM.tokens_per_second = args.llm_tps
+
+    # 所有数据库、缓存和输出都写到临时目录里
+    workspace = Path(tempfile.mkdtemp(prefix="uglygpt-bench-"))
+    os.chdir(workspace)
+    File.WORKSPACE_ROOT = workspace
+    (workspace / "data" / "github").mkdir(parents=True)
+    output = workspace / "report.md"
+    output.write_text("")
+
+    from uglygpt.coder import Coder
+    from uglygpt.obsidian import GithubTrending
+    from uglygpt.utilities import FeishuAPI, GithubAPI
+
+    github = FakeGithub(
+        trending=trending, starred=repos[::10], latency=args.github_latency
+    ).start()
+    GithubAPI.base_url = github.url
+    FeishuAPI.bot_webhook = f"{github.url}/feishu"
+
+    stages: List[Stage] = []
+    try:
+        for n in range(1, args.rounds + 1):
+            with measure(f"{n}:prepare", github, stages):
+                pipeline = GithubTrending(
+                    output=str(output), model=FakeModel.FAKE  # type: ignore
+                ).prepare()
+            with measure(f"{n}:output_markdown", github, stages):
+                pipeline.output_markdown()
+            with measure(f"{n}:feishu_output", github, stages):
+                pipeline.feishu_output()
+            if not args.no_coder:
+                with measure(f"{n}:coder", github, stages):
+                    Coder(
+                        str(workspace / f"coder_{n}.py"),
+                        REQUEST,
+                        model=FakeModel.FAKE,  # type: ignore
+                    ).gen_code()
+    finally:
+        github.stop()
+
+    print(f"{len(repos)} trending repos, workspace {workspace}")
+    print(f"GitHub requests by kind: {dict(github.requests)}")
+    report(stages)
+
+
+if __name__ == "__main__":
+    main()
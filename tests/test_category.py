@@ -0,0 +1,120 @@
+import re
+
+import pytest
+from uglychain.storage import SQLiteStorage
+
+from uglygpt.utils import count_tokens
+from uglygpt.worker.github.category import (
+    BATCH_PROMPT,
+    BATCH_ROLE,
+    BatchCategory,
+    Cate,
+    Category,
+    CategoryDetail,
+    CategoryItem,
+    CategoryList,
+)
+
+ITEM = re.compile(r"### 项目 (\d+)\n(.*)")
+
+
+def reply(packed: str, drop: int = 0) -> CategoryList:
+    items = [
+        CategoryItem(
+            index=int(index),
+            reason=description,
+            category=Cate.AI if "model" in description else Cate.Other,
+        )
+        for index, description in ITEM.findall(packed)
+        if int(index) != drop
+    ]
+    return CategoryList(items=items)
+
+
+@pytest.fixture
+def batcher():
+    return BatchCategory(batch_size=4)
+
+
+def test_batches(batcher, monkeypatch):
+    calls = []
+
+    def ask(descriptions):
+        calls.append(len(descriptions))
+        return [reply(packed) for packed in descriptions]
+
+    monkeypatch.setattr(batcher, "_ask", ask)
+    descriptions = [f"model {i}" if i % 2 else f"tool {i}" for i in range(7)]
+    results = batcher.run(descriptions)
+    assert calls == [2]
+    assert [r.reason for r in results] == descriptions
+    assert [r.category for r in results] == [
+        Cate.Other if i % 2 == 0 else Cate.AI for i in range(7)
+    ]
+
+
+def test_failed_batches_are_split(batcher, monkeypatch):
+    sizes = []
+
+    def ask(descriptions):
+        sizes.append([packed.count("### 项目") for packed in descriptions])
+        replies = []
+        for packed in descriptions:
+            if packed.count("### 项目") > 2:
+                # 超过两项的批次解析失败
+                replies.append("Error")
+            elif "missing" in packed:
+                # 漏掉第二项的回复也算失败
+                replies.append(reply(packed, drop=2))
+            else:
+                replies.append(reply(packed))
+        return replies
+
+    monkeypatch.setattr(batcher, "_ask", ask)
+    descriptions = [f"tool {i}" for i in range(6)] + ["missing"]
+    results = batcher.run(descriptions)
+    assert sizes == [[4, 3], [2, 2, 1, 2], [1, 1]]
+    assert [r.reason for r in results] == descriptions
+
+
+def test_single_item_failure_gives_none(batcher, monkeypatch):
+    def ask(descriptions):
+        return [
+            "Error" if "broken" in packed else reply(packed) for packed in descriptions
+        ]
+
+    monkeypatch.setattr(batcher, "_ask", ask)
+    results = batcher.run(["tool", "broken", "model"])
+    assert results[0].reason == "tool"
+    assert results[1] is None
+
+
+class Budget:
+    def __init__(self):
+        self.tokens = []
+
+    def acquire(self, tokens):
+        self.tokens.append(tokens)
+
+
+def test_budget_uses_batch_role(tmp_path, monkeypatch):
+    budget = Budget()
+    category = Category(
+        storage=SQLiteStorage(str(tmp_path / "test.db"), "Category"),
+        budget=budget,  # type: ignore
+        batch_size=4,
+    )
+    monkeypatch.setattr(
+        category.batcher,
+        "run",
+        lambda descriptions: [
+            CategoryDetail(reason="", category=Cate.Other) for _ in descriptions
+        ],
+    )
+    data = {f"repo/{i}": f"tool {i}" for i in range(5)}
+    result = category.run(list(data), data)
+    assert result == {name: "其他" for name in data}
+    assert budget.tokens == [
+        2 * count_tokens(BATCH_ROLE + BATCH_PROMPT)
+        + sum(count_tokens(d) for d in data.values())
+    ]
@@ -0,0 +1,65 @@
+import math
+
+from uglygpt.worker.github.classifier import LocalClassifier
+
+WORDS = {
+    "AI": ["model", "neural", "llm", "training", "inference", "transformer"],
+    "前端": ["react", "vue", "css", "component", "browser", "ui"],
+    "资料": ["book", "tutorial", "guide", "awesome", "list", "learn"],
+}
+
+
+def dataset(size: int):
+    texts, labels = {}, {}
+    for label, words in WORDS.items():
+        for i in range(size):
+            name = f"{label}/{i:03d}"
+            texts[name] = " ".join(words[(i + j) % len(words)] for j in range(4))
+            labels[name] = label
+    return texts, labels
+
+
+def test_calibrates_on_separable_data():
+    texts, labels = dataset(20)
+    classifier = LocalClassifier()
+    classifier.fit(texts, labels)
+    assert math.isfinite(classifier.threshold)
+    assert classifier.predict("a transformer model for llm inference") == "AI"
+    assert classifier.predict("react vue css component") == "前端"
+    assert classifier.hit_rate == 1.0
+
+
+def test_uncertain_predictions_are_rejected():
+    texts, labels = dataset(20)
+    classifier = LocalClassifier()
+    classifier.fit(texts, labels)
+    assert classifier.predict("something unrelated entirely") is None
+    assert classifier.predict("") is None
+    assert classifier.hits == 0
+    assert classifier.total == 2
+
+
+def test_too_few_samples():
+    texts, labels = dataset(3)
+    classifier = LocalClassifier()
+    classifier.fit(texts, labels)
+    assert classifier.threshold == math.inf
+    assert classifier.predict("a transformer model for llm inference") is None
+
+
+def test_unreachable_accuracy():
+    texts, labels = dataset(20)
+    # 标签与内容无关时，准确率达不到要求
+    names = sorted(texts)
+    shuffled = dict(zip(names, [labels[n] for n in names[7:] + names[:7]]))
+    classifier = LocalClassifier(target_accuracy=0.99)
+    classifier.fit(texts, shuffled)
+    assert classifier.threshold == math.inf
+
+
+def test_calibrate():
+    classifier = LocalClassifier(target_accuracy=0.75, min_samples=2)
+    scored = [(0.9, True), (0.8, True), (0.7, False), (0.6, True), (0.5, False)]
+    assert classifier._calibrate(scored) == 0.6
+    assert classifier._calibrate([(0.9, True)]) == math.inf
+    assert classifier._calibrate([]) == math.inf
@@ -0,0 +1,119 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from uglygpt.utilities import feishu_api
+from uglygpt.utilities.feishu_api import FeishuAPI, FeishuError
+
+
+class Response:
+    def __init__(self, status_code=200, code=0, msg="success"):
+        self.status_code = status_code
+        self._body = {"code": code, "msg": msg}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+
+class Session:
+    """Answers the posts in order, an exception is raised instead of returned."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.posts = []
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        self.posts.append(data)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(feishu_api, "time", SimpleNamespace(sleep=sleeps.append))
+    monkeypatch.setattr(
+        FeishuAPI, "rate_limiter", SimpleNamespace(acquire=lambda tokens=1: 0)
+    )
+    return sleeps
+
+
+def deliver(monkeypatch, *replies):
+    session = Session(*replies)
+    monkeypatch.setattr(FeishuAPI, "session", session)
+    delivered = list(FeishuAPI.deliver({"card": {"elements": []}}, retries=3))
+    return delivered, session
+
+
+def test_delivered(monkeypatch, sleeps):
+    delivered, session = deliver(monkeypatch, Response())
+    assert delivered == ["card"]
+    assert len(session.posts) == 1
+    assert sleeps == []
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        requests.exceptions.ConnectionError("reset"),
+        requests.exceptions.Timeout("slow"),
+        Response(503),
+        Response(code=11232, msg="frequency limited"),
+    ],
+)
+def test_transient_failures_are_retried(monkeypatch, sleeps, error):
+    delivered, session = deliver(monkeypatch, error, error, Response())
+    assert delivered == ["card"]
+    assert len(session.posts) == 3
+    assert sleeps == [2, 4]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        requests.exceptions.MissingSchema("Invalid URL ''"),
+        Response(code=19021, msg="sign match fail or timestamp is not within one hour"),
+        Response(code=19001, msg="param invalid: incoming webhook access token invalid"),
+    ],
+)
+def test_permanent_failures_are_not_retried(monkeypatch, sleeps, error):
+    delivered, session = deliver(monkeypatch, error)
+    assert delivered == []
+    assert len(session.posts) == 1
+    assert sleeps == []
+
+
+def test_retries_are_bounded(monkeypatch, sleeps):
+    error = requests.exceptions.ConnectionError("down")
+    delivered, session = deliver(monkeypatch, *[error] * 4)
+    assert delivered == []
+    assert len(session.posts) == 4
+    assert sleeps == [2, 4, 8]
+
+
+def test_error_code_is_kept(monkeypatch, sleeps):
+    monkeypatch.setattr(FeishuAPI, "session", Session(Response(code=19021, msg="bad")))
+    with pytest.raises(FeishuError) as info:
+        FeishuAPI.post("hi")
+    assert info.value.code == 19021
+
+
+def test_signs_after_rate_limit(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        FeishuAPI,
+        "rate_limiter",
+        SimpleNamespace(acquire=lambda tokens=1: events.append("acquire")),
+    )
+    monkeypatch.setattr(
+        FeishuAPI, "gen_sign", classmethod(lambda cls, t: events.append("sign"))
+    )
+    monkeypatch.setattr(FeishuAPI, "session", Session(Response()))
+    FeishuAPI.post("hi")
+    assert events == ["acquire", "sign"]
@@ -0,0 +1,109 @@
+import os
+import time
+
+import pytest
+
+from uglygpt.utilities.http_cache import HttpCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(str(tmp_path / "http"), ttl_days=1, max_entries=3, prune_every=1)
+
+
+def age(cache, url, seconds):
+    path = cache._path(url)
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+def test_get_and_set(cache):
+    assert cache.get("https://api.github.com/a") is None
+    cache.set("https://api.github.com/a", {"etag": "x", "content": "a"})
+    assert cache.get("https://api.github.com/a") == {"etag": "x", "content": "a"}
+    assert cache.get("http://localhost/a") is None
+
+
+def test_expired_entry_is_dropped(cache):
+    cache.set("a", {"content": "a"})
+    age(cache, "a", 2 * 86400)
+    assert cache.get("a") is None
+    assert not cache._path("a").exists()
+
+
+def test_broken_entry_is_ignored(cache):
+    cache.set("a", {"content": "a"})
+    cache._path("a").write_text("{not json")
+    assert cache.get("a") is None
+
+
+def test_prune_evicts_least_recently_used(cache):
+    for i, url in enumerate("abc"):
+        cache.set(url, {"content": url})
+        age(cache, url, 100 - i)
+    # 读取会刷新修改时间
+    cache.get("a")
+    cache.set("d", {"content": "d"})
+    assert [url for url in "abcd" if cache._path(url).exists()] == ["a", "c", "d"]
+
+
+def test_prune_drops_expired_entries(cache):
+    cache.set("a", {"content": "a"})
+    age(cache, "a", 2 * 86400)
+    cache.set("b", {"content": "b"})
+    assert not cache._path("a").exists()
+    assert cache.get("b") == {"content": "b"}
+
+
+def test_prune_every(tmp_path):
+    cache = HttpCache(str(tmp_path / "http"), max_entries=1, prune_every=3)
+    for url in "abc":
+        cache.set(url, {"content": url})
+    # 第一次写入时清理过一次，之后两次写入还没到下一次清理
+    assert all(cache._path(url).exists() for url in "abc")
+    cache.set("d", {"content": "d"})
+    assert [url for url in "abcd" if cache._path(url).exists()] == ["d"]
+
+
+def test_conditional_headers():
+    assert HttpCache.conditional_headers(None) == {}
+    assert HttpCache.conditional_headers(
+        {"etag": '"x"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    ) == {
+        "If-None-Match": '"x"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+
+class Response:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.headers = {"ETag": '"v1"'}
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+def test_github_contents_cached_by_full_url(cache, monkeypatch):
+    from uglygpt.utilities.github_api import GithubAPI
+
+    requests = []
+
+    def github_api(url, params=None, headers=None):
+        requests.append(headers)
+        if headers:
+            return Response(304)
+        # "aGVsbG8=" 是 "hello" 的 base64
+        return Response(200, {"content": "aGVsbG8=", "sha": "s1"})
+
+    monkeypatch.setattr(GithubAPI, "cache", cache)
+    monkeypatch.setattr(GithubAPI, "_github_api", github_api)
+    monkeypatch.setattr(GithubAPI, "base_url", "https://api.github.com")
+    assert GithubAPI._fetch_content("repos/a/b/readme") == ("hello", "s1")
+    assert GithubAPI._fetch_content("repos/a/b/readme") == ("hello", "s1")
+    assert requests[1] == {"If-None-Match": '"v1"'}
+    # 另一个服务器上的同一路径不能用这份缓存
+    monkeypatch.setattr(GithubAPI, "base_url", "http://localhost:8000")
+    GithubAPI._fetch_content("repos/a/b/readme")
+    assert requests[2] == {}
@@ -0,0 +1,58 @@
+import pytest
+
+from uglygpt.worker import cache as cache_module
+from uglygpt.worker.cache import LLMCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_key_is_stable():
+    assert LLMCache.key("m", {"a": 1, "b": 2}) == LLMCache.key("m", {"b": 2, "a": 1})
+    assert LLMCache.key("m", "x") != LLMCache.key("m", "y")
+
+
+def test_get_and_stats(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "cache.db"))
+    cache.set({"a": "1", "b": "2"})
+    assert cache.get(["a", "b", "c"]) == {"a": "1", "b": "2"}
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.get([]) == {}
+
+
+def test_ttl(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "cache.db"), ttl_days=1)
+    cache.set({"a": "1"})
+    clock.now += 86400 - 1
+    assert cache.get(["a"]) == {"a": "1"}
+    # 访问不会延长有效期
+    clock.now += 2
+    assert cache.get(["a"]) == {}
+    cache.set({"a": "2"})
+    assert cache.get(["a"]) == {"a": "2"}
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "cache.db"), max_entries=3)
+    for key in "abc":
+        clock.now += 1
+        cache.set({key: key})
+    clock.now += 1
+    cache.get(["a"])
+    clock.now += 1
+    cache.set({"d": "d"})
+    assert cache.get(list("abcd")) == {"a": "a", "c": "c", "d": "d"}
+    count = cache.db.execute("SELECT COUNT(*) FROM llm_cache")[0][0]
+    assert count == 3
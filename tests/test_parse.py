@@ -0,0 +1,148 @@
+import json
+
+import pytest
+
+from uglygpt.utils import parse
+from uglygpt.utils.parse import (
+    TrendingRepo,
+    parse_code,
+    parse_json,
+    parse_markdown,
+    parse_trending,
+    repair_json,
+)
+
+
+@pytest.fixture(autouse=True)
+def no_llm(monkeypatch):
+    # 测试里不允许退回到 LLM 修复
+    def fail(string):
+        raise AssertionError(f"LLM fallback called with {string!r}")
+
+    monkeypatch.setattr(parse, "_fix_json_with_llm", fail)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": 1,}', {"a": 1}),
+        ('[1, 2, 3, ]', [1, 2, 3]),
+        ('{"a": True, "b": False, "c": None}', {"a": True, "b": False, "c": None}),
+        ('{"a": "line\nbreak"}', {"a": "line\nbreak"}),
+        ('{"a": "say "hi" now"}', {"a": 'say "hi" now'}),
+        ('{"a": "x\\"y"}', {"a": 'x"y'}),
+        ('Sure! {"a": 1} Hope it helps.', {"a": 1}),
+        ('{"a": 1}}]', {"a": 1}),
+    ],
+)
+def test_repair_json(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_repair_json_uses_last_fence():
+    text = 'first:\n```json\n{"a": 1}\n```\nfixed:\n```json\n{"a": 2}\n```'
+    assert json.loads(repair_json(text)) == {"a": 2}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ('{"a": [1, 2', {"a": [1, 2]}),
+        ('{"a": "unterminated', {"a": "unterminated"}),
+        ('{"a": "ends with \\', {"a": "ends with "}),
+        ('{"a": 1, "b":', {"a": 1, "b": None}),
+        ('{"a": {"b": [1,', {"a": {"b": [1]}}),
+    ],
+)
+def test_repair_json_truncated(text, expected):
+    assert json.loads(repair_json(text)) == expected
+
+
+def test_repair_json_without_value():
+    assert repair_json("  no json here  ") == "no json here"
+
+
+def test_repair_json_many_stray_quotes():
+    value = '"x" ' * 5000
+    result = json.loads(repair_json('{"a": "' + value + '"}'))
+    assert result == {"a": value}
+
+
+def test_parse_json_valid_is_untouched():
+    assert parse_json('{"a": [1, {"b": null}]}') == {"a": [1, {"b": None}]}
+
+
+def test_parse_json_repairs():
+    assert parse_json('```json\n{"a": True,}\n```') == {"a": True}
+
+
+def test_parse_json_wraps_errors():
+    with pytest.raises(json.JSONDecodeError):
+        parse_json(None)
+
+
+def test_parse_markdown():
+    text = "intro\n## a\nx\n\n## b\ny\nz\n## empty"
+    assert parse_markdown(text) == {"a": "x", "b": "y\nz"}
+
+
+@pytest.mark.parametrize(
+    "text, lang, expected",
+    [
+        ("```python\nprint(1)\n```", "python", "print(1)"),
+        ("Intro\n```python   \n\n    indented\n```\nOutro", "python", "    indented"),
+        ("```js\na\n```\ntext ```python\nb\n```", "python", "b"),
+        ("```js\nlet a = 1\n```", "python", "let a = 1"),
+        ("```python\nopen = True\n", "python", "open = True"),
+        ("```bash\nls\n```", "bash", "ls"),
+    ],
+)
+def test_parse_code(text, lang, expected):
+    assert parse_code(text, lang) == expected
+
+
+def test_parse_code_without_block():
+    with pytest.raises(Exception):
+        parse_code("just prose")
+
+
+def test_parse_markdown_rejects_non_string():
+    with pytest.raises(ValueError):
+        parse_markdown(None)  # type: ignore
+
+
+def test_parse_markdown_only_splits_on_second_level_titles():
+    text = "## a\n### sub\nx\n# top\n## b\ny"
+    assert parse_markdown(text) == {"a": "### sub\nx\n# top", "b": "y"}
+
+
+TRENDING = """# Trending
+
+## All Languages
+
+- [a/one](https://github.com/a/one) - First repo
+- [b/two](https://github.com/b/two) - Second - with dash
+not a repo line
+
+## Python
+- [c/three](https://github.com/c/three) - Third
+
+## Empty
+"""
+
+
+def test_parse_trending():
+    sections = parse_trending(TRENDING)
+    assert list(sections) == ["All Languages", "Python", "Empty"]
+    assert sections["All Languages"] == (
+        TrendingRepo("a/one", "https://github.com/a/one", "First repo", "All Languages"),
+        TrendingRepo(
+            "b/two", "https://github.com/b/two", "Second - with dash", "All Languages"
+        ),
+    )
+    assert [repo.name for repo in sections["Python"]] == ["c/three"]
+    assert sections["Empty"] == ()
+
+
+def test_parse_trending_is_cached():
+    assert parse_trending(TRENDING) is parse_trending(TRENDING)
@@ -0,0 +1,115 @@
+import pytest
+
+from uglygpt.utilities import rate_limiter
+from uglygpt.utilities.rate_limiter import RateLimiter
+
+
+class Clock:
+    """Stands in for the `time` module, sleeping only advances the clock."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+
+
+class Response:
+    def __init__(self, status_code=200, text="", **headers):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {k.replace("_", "-"): str(v) for k, v in headers.items()}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def quota(clock, remaining, limit=5000, reset=100, resource="core", status=200):
+    return Response(
+        status,
+        X_RateLimit_Limit=limit,
+        X_RateLimit_Remaining=remaining,
+        X_RateLimit_Reset=clock.now + reset,
+        X_RateLimit_Resource=resource,
+    )
+
+
+def test_plenty_of_quota_is_not_paced(clock):
+    limiter = RateLimiter()
+    limiter.update(quota(clock, 4000))
+    for _ in range(10):
+        limiter.acquire()
+    assert clock.sleeps == []
+    assert limiter.stats()["requests"] == 10
+    assert limiter.stats()["quota_remaining"] == {"core": 3990}
+
+
+def test_low_quota_is_spread_until_reset(clock):
+    limiter = RateLimiter()
+    limiter.update(quota(clock, 100, reset=100))
+    for _ in range(3):
+        limiter.acquire()
+    # 剩余 100 次、100 秒后重置，大约每秒一次
+    assert clock.sleeps == pytest.approx([1.0, 1.0], abs=0.05)
+    assert limiter.throttled == pytest.approx(2.0, abs=0.1)
+
+
+def test_exhausted_quota_waits_for_reset(clock):
+    limiter = RateLimiter()
+    limiter.update(quota(clock, 0, reset=30))
+    limiter.acquire()
+    assert clock.sleeps == [30]
+
+
+def test_quotas_are_per_resource(clock):
+    limiter = RateLimiter()
+    limiter.update(quota(clock, 0, reset=30, resource="graphql"))
+    limiter.acquire("core")
+    assert clock.sleeps == []
+    limiter.acquire("graphql")
+    assert clock.sleeps == [30]
+
+
+def test_not_modified_costs_no_quota(clock):
+    limiter = RateLimiter()
+    limiter.update(quota(clock, 10, status=304))
+    limiter.update(quota(clock, 10))
+    assert limiter.stats()["quota_used"] == {"core": 1}
+
+
+def test_retry_after(clock):
+    limiter = RateLimiter()
+    assert limiter.update(Response(403, Retry_After=7)) == 7
+    assert limiter.retries == 1
+    # 其他请求也要等到限流结束
+    limiter.acquire()
+    assert clock.sleeps == [7]
+
+
+def test_primary_limit_waits_for_reset(clock):
+    limiter = RateLimiter()
+    assert limiter.update(quota(clock, 0, reset=20, status=403)) == 21
+
+
+def test_secondary_limit_backs_off(clock):
+    limiter = RateLimiter(backoff=10)
+    assert limiter.update(Response(429), 0) == 10
+    assert limiter.update(Response(403, "You have exceeded a rate limit"), 2) == 40
+
+
+def test_no_retry(clock):
+    limiter = RateLimiter(max_retries=2)
+    # 真正的无权限错误
+    assert limiter.update(Response(403, "Forbidden")) == 0
+    assert limiter.update(Response(429), 2) == 0
+    assert limiter.update(Response(200)) == 0
+    assert limiter.retries == 0
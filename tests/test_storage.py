@@ -0,0 +1,148 @@
+import threading
+
+import pytest
+from uglychain.storage import SQLiteStorage as PlainStorage
+
+from uglygpt.utils import storage
+from uglygpt.utils.storage import Database, transaction
+
+
+@pytest.fixture
+def db(tmp_path):
+    return Database(str(tmp_path / "test.db"))
+
+
+def committed(db, table):
+    # 另开一个连接，只能看到已经提交的数据
+    return Database(db.file).table(table).load()
+
+
+def test_save_outside_transaction_commits(db):
+    db.table("t").save({"a": "1"})
+    assert committed(db, "t") == {"a": "1"}
+
+
+def test_nested_transaction_commits_at_outermost_exit(db):
+    table = db.table("t")
+    with db.transaction():
+        with db.transaction():
+            table.save({"a": "1"})
+        assert committed(db, "t") == {}
+        table.save({"b": "2"})
+        assert table.load() == {"a": "1", "b": "2"}
+    assert committed(db, "t") == {"a": "1", "b": "2"}
+
+
+def test_transaction_rolls_back_on_exception(db):
+    table = db.table("t")
+    table.save({"a": "1"})
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            table.save({"a": "2", "b": "2"})
+            raise RuntimeError
+    assert table.load() == {"a": "1"}
+    assert committed(db, "t") == {"a": "1"}
+    # 回滚后连接仍可正常使用
+    table.save({"c": "3"})
+    assert committed(db, "t") == {"a": "1", "c": "3"}
+
+
+def test_inner_exception_handled_by_caller_keeps_outer_writes(db):
+    table = db.table("t")
+    with db.transaction():
+        table.save({"a": "1"})
+        try:
+            with db.transaction():
+                raise ValueError
+        except ValueError:
+            pass
+    assert committed(db, "t") == {"a": "1"}
+
+
+def test_rollback_keeps_other_threads_writes(db):
+    table = db.table("t")
+    started = threading.Event()
+
+    def write():
+        started.wait()
+        table.save({"other": "1"})
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            table.save({"mine": "1"})
+            started.set()
+            # 另一个线程要等事务结束才能写入
+            writer.join(0.2)
+            assert writer.is_alive()
+            raise RuntimeError
+    writer.join()
+    assert committed(db, "t") == {"other": "1"}
+
+
+def test_transaction_helper(db, tmp_path):
+    first, second = db.table("first"), db.table("second")
+    with transaction(first):
+        first.save({"a": "1"})
+        second.save({"b": "2"})
+        assert committed(db, "first") == {}
+    assert committed(db, "first") == {"a": "1"}
+    assert committed(db, "second") == {"b": "2"}
+
+    plain = PlainStorage(str(tmp_path / "plain.db"), "t")
+    with transaction(plain):
+        plain.save({"a": "1"})
+    assert plain.load() == {"a": "1"}
+
+
+def test_load_in_chunks(db, monkeypatch):
+    monkeypatch.setattr(storage, "MAX_VARIABLES", 3)
+    table = db.table("t")
+    data = {f"k{i}": str(i) for i in range(10)}
+    table.save(data)
+    keys = [f"k{i}" for i in range(12)] + ["k0", "k1"]
+    assert table.load(keys) == data
+    assert table.load("k5") == {"k5": "5"}
+    assert table.load(keys, condition="value > '5'") == {
+        k: v for k, v in data.items() if v > "5"
+    }
+
+
+def test_expired_rows_are_not_loaded(db):
+    table = db.table("t", 1)
+    table.save({"a": "1", "b": "2"})
+    db.execute(
+        f"UPDATE {table.table} SET timestamp = date('now', '-2 day') WHERE key = 'a'"
+    )
+    assert table.load() == {"b": "2"}
+    assert table.load(["a", "b"]) == {"b": "2"}
+
+
+def test_group_with_keys(db):
+    table = db.table("t")
+    table.save({"a": "x", "b": "y", "c": "x", "d": "y", "e": "z"})
+    assert table.group(["c", "b", "a", "missing", "c"]) == {
+        "x": ["c", "a"],
+        "y": ["b"],
+    }
+
+
+def test_group_all(db):
+    table = db.table("t")
+    table.save({"a": "y", "b": "x", "c": "y"})
+    groups = table.group()
+    assert list(groups) == ["x", "y"]
+    assert groups["x"] == ["b"]
+    assert sorted(groups["y"]) == ["a", "c"]
+    assert table.group(condition="key != 'a'") == {"x": ["b"], "y": ["c"]}
+
+
+def test_group_skips_expired_rows(db):
+    table = db.table("t", 1)
+    table.save({"a": "x", "b": "x"})
+    db.execute(
+        f"UPDATE {table.table} SET timestamp = date('now', '-2 day') WHERE key = 'a'"
+    )
+    assert table.group() == {"x": ["b"]}
+    assert table.group(["a", "b"]) == {"x": ["b"]}
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from uglygpt.utils import parse
+from uglygpt.utils.parse import parse_code
+from uglygpt.utils.stream import CodeStream, JsonStream, parse_stream
+
+
+def chunked(text: str, size: int):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture(autouse=True)
+def no_llm(monkeypatch):
+    def fail(string):
+        raise AssertionError(f"LLM fallback called with {string!r}")
+
+    monkeypatch.setattr(parse, "_fix_json_with_llm", fail)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Here it is:\n```python\ndef f():\n    return 1\n```\nDone.",
+        "```python\nprint(1)\n```",
+        "```js\na\n```\ntext ```python\nb\n```",
+        "Use this ```python\nx = 1\n```",
+        "```js\nconsole.log(1)\n```\nno python here",
+        "```python\nunterminated = True\n",
+        "```python\n    indented = 1\n```",
+        "```python\nlast = 1```",
+    ],
+)
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_code_stream_matches_parse_code(text, size):
+    assert parse_stream(chunked(text, size), CodeStream()) == parse_code(text)
+
+
+def test_code_stream_returns_at_closing_fence():
+    parser = CodeStream("js")
+    assert parser.feed("```js\nlet a = 1\n") is None
+    assert parser.feed("```\nmore text") == "let a = 1"
+
+
+def test_code_stream_without_block():
+    with pytest.raises(Exception):
+        parse_stream(["no code at all"], CodeStream())
+
+
+def test_parse_stream_closes_generator():
+    consumed = []
+
+    def tokens():
+        for token in ["```python\n", "x = 1\n", "```\n", "never ", "read"]:
+            consumed.append(token)
+            yield token
+
+    stream = tokens()
+    assert parse_stream(stream, CodeStream()) == "x = 1"
+    assert consumed == ["```python\n", "x = 1\n", "```\n"]
+    with pytest.raises(StopIteration):
+        next(stream)
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_json_stream(size):
+    value = {"a": "brackets } ] in \"strings\"", "b": [1, {"c": None}]}
+    text = "Sure:\n```json\n" + json.dumps(value) + "\n```\ntrailing {text"
+    assert parse_stream(chunked(text, size), JsonStream()) == value
+
+
+def test_json_stream_returns_when_closed():
+    parser = JsonStream()
+    assert parser.feed('prefix [1, {"a": ') is None
+    assert parser.feed('"]"}') is None
+    assert parser.feed("] and more") == [1, {"a": "]"}]
+
+
+def test_json_stream_repairs_truncated_value():
+    assert parse_stream(['{"a": [1, 2]', ', "b": "x'], JsonStream()) == {
+        "a": [1, 2],
+        "b": "x",
+    }
+
+
+def test_json_stream_without_value():
+    with pytest.raises(json.JSONDecodeError):
+        parse_stream(["no json"], JsonStream())
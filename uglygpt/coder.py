@@ -10,6 +10,7 @@ from uglychain import Model
 from uglychain.storage import FileStorage
 from .utils import File
 from uglygpt.worker.code import CodeWriter, CodeReviewer, CodeRewriter
+from uglygpt.worker.cache import LLMCache
 
 
 @dataclass
@@ -71,11 +72,19 @@ class Coder:
                 self.gen_code()
         return self._code
 
+    @property
+    def cache(self) -> LLMCache:
+        if not hasattr(self, "_cache"):
+            self._cache = LLMCache()
+        return self._cache
+
     @property
     def writer(self) -> CodeWriter:
         if not hasattr(self, "_writer"):
             self._writer = CodeWriter(
-                model=self.model, storage=FileStorage(self.file_path)
+                model=self.model,
+                storage=FileStorage(self.file_path),
+                cache=self.cache,
             )
         return self._writer
 
@@ -83,7 +92,9 @@ class Coder:
     def reviewer(self) -> CodeReviewer:
         if not hasattr(self, "_reviewer"):
             self._reviewer = CodeReviewer(
-                model=self.model, storage=FileStorage(self.file_path)
+                model=self.model,
+                storage=FileStorage(self.file_path),
+                cache=self.cache,
             )
         return self._reviewer
 
@@ -91,6 +102,8 @@ class Coder:
     def rewriter(self) -> CodeRewriter:
         if not hasattr(self, "_rewriter"):
             self._rewriter = CodeRewriter(
-                model=self.model, storage=FileStorage(self.file_path)
+                model=self.model,
+                storage=FileStorage(self.file_path),
+                cache=self.cache,
             )
         return self._rewriter
@@ -1,19 +1,24 @@
 #!/usr/bin/env python3
 # -*-coding:utf-8-*-
 
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict
+from typing import TYPE_CHECKING, Dict, List, Optional
 import urllib.parse
 import re
 
 from loguru import logger
 
-from uglychain import Model
-from uglychain.storage import SQLiteStorage
-from .utils import File, parse_markdown
-from uglygpt.worker.github import ReadmeSummarizer, Category
-from uglygpt.utilities import GithubAPI, FeishuAPI
+from .utils import File, TokenBucket, parse_trending, tracer
+
+# uglychain、各个 worker 和 API 客户端都很重，用到时才导入，`trending` 可以很快启动
+if TYPE_CHECKING:
+    from uglychain import Model
+    from .utils import Database, SQLiteStorage
+    from uglygpt.worker.github import ReadmeSummarizer, Category
+    from uglygpt.worker.cache import LLMCache
 
 FRONT_MATTER = """---
 date: {time}
@@ -27,84 +32,207 @@ description: {description}
 ---
 """
 
+FINISHED_REPO = re.compile(r"- \[x\] \[(?P<name>[^\]\n]+)\]")
+
+LANGUAGES = ["All Languages", "Python", "Typescript", "Rust", "Go", "Html", "Css"]
+
 
 @dataclass
 class GithubTrending:
+    """Summarizes, categorizes and publishes the Github trending repos.
+
+    Every stage (the database and its tables, the workers, the finished-repo
+    sync, the trending list and the stored summaries) is built on first use
+    and cached, so constructing the object costs nothing and each method
+    only pays for what it needs. `prepare()` runs them all up front.
+
+    `model` defaults to `Model.DEFAULT` and `summarizer_model` to `model`.
+    """
+
     output: str = "/home/uglyboy/Documents/Temp/Github 趋势.md"
     filename: str = "data/github/github.db"
-    summarizer: ReadmeSummarizer = field(init=False)
-    category: Category = field(init=False)
-    model: Model = Model.DEFAULT
-    summarizer_model: Model = Model.DEFAULT
-    _data: Dict[str, str] = field(init=False)
+    model: Optional["Model"] = None
+    summarizer_model: Optional["Model"] = None
+    block: int = 15
+    max_inflight: int = 2
+    tpm: Dict[str, int] = field(default_factory=dict)
+    category_batch: int = 10
+    local_accuracy: float = 0.95
+    feishu_merge: int = 1
 
     def __post_init__(self):
-        if self.summarizer_model == Model.DEFAULT and self.model != Model.DEFAULT:
-            self.summarizer_model = self.model
-        self.summarizer = ReadmeSummarizer(
-            self.summarizer_model, storage=SQLiteStorage(self.filename, "ReadmeSummarizer", 30)
-        )
-        self.category = Category(
-            self.model, storage=SQLiteStorage(self.filename, "Category", 30)
-        )
-        self.finished = SQLiteStorage(self.filename, "Finished", 30)
-        self.old = SQLiteStorage(self.filename, "Feishu", 30)
-        self.config = SQLiteStorage(self.filename, "Config")
-
-        self._repo_names = []
-        self._repo_descriptions = {}
+        self._tables: Dict[str, "SQLiteStorage"] = {}
+
+    def prepare(self) -> "GithubTrending":
+        """Runs every lazy stage now, e.g. to warm up before a timed run."""
+        _ = self.summarizer, self.category, self.data
+        return self
+
+    @property
+    def db(self) -> "Database":
+        from .utils import Database
+
+        # 所有表共用一个连接，写入按阶段合并到一个事务里
+        if not hasattr(self, "_db"):
+            self._db = Database(self.filename)
+        return self._db
+
+    def _table(self, name: str, days: int = 10) -> "SQLiteStorage":
+        if name not in self._tables:
+            self._tables[name] = self.db.table(name, days)
+        return self._tables[name]
+
+    @property
+    def summaries(self) -> "SQLiteStorage":
+        # README 有变化时才会重新总结，所以总结结果可以保存更久
+        return self._table("ReadmeSummarizer", 365)
+
+    @property
+    def categories(self) -> "SQLiteStorage":
+        return self._table("Category", 30)
+
+    @property
+    def finished(self) -> "SQLiteStorage":
+        return self._table("Finished", 30)
+
+    @property
+    def starred(self) -> "SQLiteStorage":
+        # Star 只做增量同步，不会每天重新写入，所以不能按 30 天过期
+        return self._table("Starred", 3650)
+
+    @property
+    def old(self) -> "SQLiteStorage":
+        return self._table("Feishu", 30)
+
+    @property
+    def config(self) -> "SQLiteStorage":
+        return self._table("Config")
 
+    @property
+    def budgets(self) -> Dict[str, TokenBucket]:
+        # 同一个模型的两个阶段共用一个 token 预算
+        if not hasattr(self, "_budgets"):
+            self._budgets = {
+                name: TokenBucket.per_minute(limit) for name, limit in self.tpm.items()
+            }
+        return self._budgets
+
+    @property
+    def cache(self) -> "LLMCache":
+        from uglygpt.worker.cache import LLMCache
+
+        if not hasattr(self, "_cache"):
+            self._cache = LLMCache()
+        return self._cache
+
+    def _model(self) -> "Model":
+        from uglychain import Model
+
+        return self.model or Model.DEFAULT
+
+    @property
+    def summarizer(self) -> "ReadmeSummarizer":
+        from uglygpt.worker.github import ReadmeSummarizer
+
+        if not hasattr(self, "_summarizer"):
+            model = self.summarizer_model or self._model()
+            self._summarizer = ReadmeSummarizer(
+                model,
+                storage=self.summaries,
+                versions=self._table("ReadmeVersion", 365),
+                budget=self.budgets.get(model.name),
+                cache=self.cache,
+            )
+        return self._summarizer
+
+    @property
+    def category(self) -> "Category":
+        from uglygpt.worker.github import Category, LocalClassifier
+
+        if not hasattr(self, "_category"):
+            model = self._model()
+            self._category = Category(
+                model,
+                storage=self.categories,
+                llm_labels=self._table("CategoryLLM", 30),
+                budget=self.budgets.get(model.name),
+                cache=self.cache,
+                batch_size=self.category_batch,
+                classifier=LocalClassifier(self.local_accuracy)
+                if self.local_accuracy
+                else None,
+            )
+        return self._category
+
+    @property
+    def repo_names(self) -> List[str]:
+        """The trending repos that are not finished yet, in trending order."""
+        from uglygpt.utilities import GithubAPI
+
+        if not hasattr(self, "_repo_names"):
+            self._repo_descriptions = {}
+            names = self._fetch_trending_repos(GithubAPI.fetch_trending_file())
+            self._sync_finished(self._repo_descriptions)
+            # 去重并去除已经完成的
+            self._repo_names = self._remove_finished_repos(list(dict.fromkeys(names)))
+        return self._repo_names
+
+    @property
+    def repo_descriptions(self) -> Dict[str, str]:
+        _ = self.repo_names
+        return self._repo_descriptions
+
+    @property
+    def data(self) -> Dict[str, str]:
+        """The summaries of `repo_names`, filled in as they are summarized."""
+        if not hasattr(self, "_data"):
+            self._data = self.summaries.load(self.repo_names)
+        return self._data
+
+    def _sync_finished(self, descriptions: Dict[str, str]):
         date = self.config.load("Date").get("Date", "")
         if date != datetime.now().strftime("%Y-%m-%d"):
-            self._check_finished()
-
-        text = GithubAPI.fetch_trending_file()
-        for language in [
-            "All Languages",
-            "Python",
-            "Typescript",
-            "Rust",
-            "Go",
-            "Html",
-            "Css",
-        ]:
-            self._fetch_trending_repos(text, language)
-
-        # 去重
-        _set = set(self._repo_names)
-        self._repo_names = list(_set)
-        # 去除已经完成的
-        self._remove_finished_repos()
-        # 加载数据库
-        self._data = self.summarizer.storage.load(self._repo_names)
-
-    def _check_finished(self):
+            # 同步 Star 要翻页请求，不能包在一个事务里，否则中途失败时整批回滚
+            self._check_finished(descriptions)
+
+    def _check_finished(self, descriptions: Dict[str, str]):
         logger.info("Updating The Finished Repos...")
-        # self._set_finished_with_favourite()
+        # self._set_finished_with_favourite(descriptions)
         self._set_finished_with_stars()
         self._set_finished_with_markdown()
         self.config.save({"Date": datetime.now().strftime("%Y-%m-%d")})
 
-    def _remove_finished_repos(self):
-        finished_repos = self.finished.load(self._repo_names)
-        self._repo_names = [
-            name for name in self._repo_names if name not in finished_repos.keys()
-        ]
+    def _remove_finished_repos(self, names: List[str]) -> List[str]:
+        finished_repos = self.finished.load(names)
+        finished_repos.update(self.starred.load(names))
+        return [name for name in names if name not in finished_repos.keys()]
 
     def _set_finished_with_stars(self):
-        stars = set(GithubAPI.fetch_starred_repos())
-        data = {k: "Starred" for k in stars}
-        self.finished.save(data)
+        from uglygpt.utilities import GithubAPI
+
+        since = self.config.load("StarredAt").get("StarredAt")
+        latest = since or ""
+        data = {}
+        for name, starred_at in GithubAPI.fetch_starred_since(since=since):
+            latest = max(latest, starred_at)
+            data[name] = "Starred"
+            # 每满一页就写入，中途失败时已同步的部分不会丢失
+            if len(data) >= 100:
+                self.starred.save(data)
+                data = {}
+        self.starred.save(data)
+        # 从新到旧遍历，只有完整走完后才能推进检查点
+        if latest:
+            self.config.save({"StarredAt": latest})
 
     def _set_finished_with_markdown(self):
         markdown_text = File.load(self.output)
-        pattern = r"- \[x\] \[(?P<name>.+?)\]"
-        matches = re.findall(pattern, markdown_text, re.MULTILINE)
+        matches = FINISHED_REPO.findall(markdown_text)
         old = self.finished.load(matches)
         data = {k: "Marked" for k in matches if k not in old.keys()}
         self.finished.save(data)
 
-    def _set_finished_with_favourite(self):
+    def _set_finished_with_favourite(self, descriptions: Dict[str, str]):
         dir_path = File.to_path(self.output).parent
         favourite_List = []
         file_index = {}
@@ -116,15 +244,15 @@ class GithubTrending:
                     favourite_List.append(name)
                     if file.stat().st_size == 0:
                         file_index[name] = file
-        dict = self.summarizer.storage.load(favourite_List)
+        dict = self.summaries.load(favourite_List)
         data = {}
         for name in favourite_List:
             if name not in dict.keys():
                 continue
             data[name] = "Liked"
             if name in file_index.keys():
-                description = self._repo_descriptions.get(name, "")
-                category = self.category.storage.load(name).get(name, "Other")  # type: ignore
+                description = descriptions.get(name, "")
+                category = self.categories.load(name).get(name, "Other")  # type: ignore
                 context = FRONT_MATTER.format(
                     description=description,
                     time=datetime.now().strftime("%Y-%m-%d %H:%M"),
@@ -138,114 +266,205 @@ class GithubTrending:
                 File.save(file_index[name], context)
         self.finished.save(data)
 
-    def _fetch_trending_repos(self, text: str, language: str = "All Languages"):
-        markdown = parse_markdown(text)
-        pattern = r"\-\s\[(.*?)\]\((.*?)\)\s-\s(.*?)\n"
-        matches = re.findall(pattern, markdown[language])
-
-        for match in matches:
-            name, _, context = match
-            self._repo_names.append(name)
-            self._repo_descriptions[name] = context
+    def _fetch_trending_repos(self, text: str) -> List[str]:
+        trending = parse_trending(text)
+        names = []
+        for language in LANGUAGES:
+            for repo in trending.get(language, ()):
+                names.append(repo.name)
+                self._repo_descriptions[repo.name] = repo.description
+        return names
 
     def _fetch_summarizer(self, names: list[str]):
-        description_list = [self._repo_descriptions[repo_name] for repo_name in names]
+        description_list = [self.repo_descriptions[repo_name] for repo_name in names]
         datas = self.summarizer.run(names, description_list)
-        self._data.update(datas)
+        self.data.update(datas)
 
     def _fetch_category(self, names: list[str]):
-        category_list = self.category.run(names, self._data)
-        return category_list
+        # 总结在其他线程里还在写入 _data，这里只取本 block 的快照
+        data = {k: self.data[k] for k in names if k in self.data}
+        self.category.run(names, data)
+
+    def _run_pipeline(self) -> None:
+        """Summarizes and categorizes the repos block by block.
+
+        Up to `max_inflight` blocks are summarized at once, and each block is
+        categorized as soon as its summaries are ready, so categorizing block
+        N overlaps summarizing the blocks after it. The categories are saved
+        to the Category table, which `categories.group` reads.
+        """
+        blocks = [
+            self.repo_names[i : i + self.block]
+            for i in range(0, len(self.repo_names), self.block)
+        ]
+        # 用已有的总结和分类训练本地分类器
+        self.category.fit(self.summaries.load())
+        with (
+            ThreadPoolExecutor(self.max_inflight) as summarizing,
+            ThreadPoolExecutor(1) as categorizing,
+        ):
+            # 在线程里运行时保留当前的 span，让它们记在 output_markdown 之下
+            summaries = [
+                summarizing.submit(copy_context().run, self._fetch_summarizer, b)
+                for b in blocks
+            ]
+            categories = []
+            for repo_names, summary in zip(blocks, summaries):
+                summary.result()
+                categories.append(
+                    categorizing.submit(
+                        copy_context().run, self._fetch_category, repo_names
+                    )
+                )
+            for category in categories:
+                category.result()
 
     def output_markdown(self, filename: str | None = None):
-        if filename:
-            self.output = filename
-        # 增加循环，每次执行 20 个，避免并发太快
-        block = 15
-        i = 0
-        category_list = {}
-        while i * block < len(self._repo_names):
-            repo_names = self._repo_names[i * block : i * block + block]
-            # 先更新数据库
-            self._fetch_summarizer(repo_names)
-            # 更新分类，并获得分类结果
-            category_list_part = self._fetch_category(repo_names)
-            for k, v in category_list_part.items():
-                if k in category_list.keys():
-                    category_list[k].extend(v)
-                else:
-                    category_list[k] = v
-            i += 1
-
-        # 生成 markdown
-        markdown_txt = FRONT_MATTER.format(
-            description="Github Trending 项目解读",
-            time=datetime.now().strftime("%Y-%m-%d %H:%M"),
-            url="",
-            category="Github",
-        )
-        for category in ["AI", "后端", "前端", "资料", "其他"]:
-            if category not in category_list.keys():
-                continue
-            markdown_txt += f"## {category}\n\n"
-            for repo_name in category_list[category]:
-                if repo_name not in self._data.keys():
-                    continue
-                name = urllib.parse.quote(repo_name, safe="")
-                url = f"https://www.github.com/{repo_name}"
-                markdown_txt += f"- [ ] [{repo_name}]({url}) - {self._repo_descriptions[repo_name]} [![](https://img.shields.io/badge/Click-Like-blue)]({name}) \n\n"
-                for line in self._data[repo_name].split("\n"):
-                    markdown_txt += f"> {line}\n"
-                markdown_txt += "\n"
-
-        File.save(self.output, markdown_txt)
+        with tracer.span("output_markdown", repos=len(self.repo_names)):
+            if filename:
+                self.output = filename
+            # 在启动线程之前把各阶段都建好，线程里只读不建
+            self.prepare()
+            # 每个 block 的总结和分类各在一个事务里提交，中途退出也不会丢掉已完成的部分
+            self._run_pipeline()
+            category_list = self.categories.group(self.repo_names)
+
+            # 按分类逐段写入临时文件，完成后原子替换
+            with File.stream(self.output) as f:
+                f.write(
+                    FRONT_MATTER.format(
+                        description="Github Trending 项目解读",
+                        time=datetime.now().strftime("%Y-%m-%d %H:%M"),
+                        url="",
+                        category="Github",
+                    )
+                )
+                for category in ["AI", "后端", "前端", "资料", "其他"]:
+                    if category not in category_list.keys():
+                        continue
+                    f.write(f"## {category}\n\n")
+                    for repo_name in category_list[category]:
+                        if repo_name not in self.data.keys():
+                            continue
+                        name = urllib.parse.quote(repo_name, safe="")
+                        url = f"https://www.github.com/{repo_name}"
+                        f.write(
+                            f"- [ ] [{repo_name}]({url}) - {self.repo_descriptions[repo_name]} [![](https://img.shields.io/badge/Click-Like-blue)]({name}) \n\n"
+                        )
+                        f.writelines(
+                            f"> {line}\n" for line in self.data[repo_name].split("\n")
+                        )
+                        f.write("\n")
+                    f.flush()
 
     def feishu_output(self):
-        _category = self.category.storage.load(self._repo_names)
-        _repo_names = [i for i in self._repo_names if _category.get(i) == "AI"]
-        old_repos = self.old.load(_repo_names, "timestamp != date('now','localtime')")
-        _repo_names = [i for i in _repo_names if i not in old_repos.keys()]
-        self.old.save({i: "1" for i in _repo_names})
-        for name in _repo_names:
-            card = {
+        from uglygpt.utilities import FeishuAPI
+
+        with tracer.span("feishu_output") as span:
+            _repo_names = self.categories.group(self.repo_names).get("AI", [])
+            old_repos = self.old.load(
+                _repo_names, "timestamp != date('now','localtime')"
+            )
+            _repo_names = [
+                i for i in _repo_names if i not in old_repos.keys() and i in self.data
+            ]
+            # 每张卡片最多合并 feishu_merge 个项目
+            size = max(1, self.feishu_merge)
+            cards = {
+                tuple(_repo_names[i : i + size]): self._feishu_card(
+                    _repo_names[i : i + size]
+                )
+                for i in range(0, len(_repo_names), size)
+            }
+            span.set("repos", len(_repo_names))
+            span.set("cards", len(cards))
+            # 只记录发送成功的卡片，失败的下次还会再发
+            for names in FeishuAPI.deliver(cards):
+                self.old.save({name: "1" for name in names})
+                span.add("delivered")
+
+    def update_index(self):
+        """Embeds the new and changed summaries for `GithubIndex` search."""
+        try:
+            from uglygpt.worker.github.find_repo import GithubIndex
+        except ImportError as e:
+            # llama-index 只是开发依赖，没有安装时跳过
+            logger.warning(f"Skip updating the Github index: {e}")
+            return
+        try:
+            GithubIndex(self.filename, db=self.db).update()
+        except Exception as e:
+            # 索引只用于搜索，向量化失败（密钥、网络、限流）不应让每日任务失败
+            logger.warning(f"Failed to update the Github index: {e}")
+
+    def _feishu_card(self, names: List[str]) -> dict:
+        if len(names) == 1:
+            name = names[0]
+            return {
                 "config": {"wide_screen_mode": True},
-                "elements": [
-                    {
-                        "tag": "note",
-                        "elements": [
-                            {
-                                "tag": "plain_text",
-                                "content": f"{self._repo_descriptions[name]}",
-                            }
-                        ],
-                    },
-                    {"tag": "markdown", "content": f"{self._data[name]}"},
-                    {
-                        "tag": "action",
-                        "actions": [
-                            {
-                                "tag": "button",
-                                "text": {"tag": "plain_text", "content": "前往项目"},
-                                "type": "primary",
-                                "multi_url": {
-                                    "url": f"https://www.github.com/{name}",
-                                    "pc_url": "",
-                                    "android_url": "",
-                                    "ios_url": "",
-                                },
-                            }
-                        ],
-                    },
-                ],
+                "elements": self._feishu_elements(name),
                 "header": {
                     "template": "blue",
                     "title": {"content": f"{name}", "tag": "plain_text"},
                 },
             }
-            FeishuAPI.post(card)
+        elements = []
+        for name in names:
+            if elements:
+                elements.append({"tag": "hr"})
+            elements.append({"tag": "markdown", "content": f"**{name}**"})
+            elements.extend(self._feishu_elements(name))
+        return {
+            "config": {"wide_screen_mode": True},
+            "elements": elements,
+            "header": {
+                "template": "blue",
+                "title": {
+                    "content": f"Github 趋势：{len(names)} 个 AI 项目",
+                    "tag": "plain_text",
+                },
+            },
+        }
+
+    def _feishu_elements(self, name: str) -> List[dict]:
+        return [
+            {
+                "tag": "note",
+                "elements": [
+                    {
+                        "tag": "plain_text",
+                        "content": f"{self.repo_descriptions[name]}",
+                    }
+                ],
+            },
+            {"tag": "markdown", "content": f"{self.data[name]}"},
+            {
+                "tag": "action",
+                "actions": [
+                    {
+                        "tag": "button",
+                        "text": {"tag": "plain_text", "content": "前往项目"},
+                        "type": "primary",
+                        "multi_url": {
+                            "url": f"https://www.github.com/{name}",
+                            "pc_url": "",
+                            "android_url": "",
+                            "ios_url": "",
+                        },
+                    }
+                ],
+            },
+        ]
 
 
 def trending():
-    trending = GithubTrending(model=Model.GPT3_TURBO)
-    trending.output_markdown()
-    trending.feishu_output()
\ No newline at end of file
+    from uglychain import Model
+    from uglygpt.utilities import GithubAPI
+
+    with tracer.span("trending") as span:
+        trending = GithubTrending(model=Model.GPT3_TURBO)
+        trending.output_markdown()
+        trending.feishu_output()
+        trending.update_index()
+        span.set("github", GithubAPI.rate_limiter.stats())
+    logger.info(f"Github API usage: {GithubAPI.rate_limiter.stats()}")
\ No newline at end of file
@@ -1,4 +1,14 @@
-from .github_api import GithubAPI
-from .feishu_api import FeishuAPI
+from typing import TYPE_CHECKING
 
-__all__ = ["GithubAPI", "FeishuAPI"]
+from uglygpt.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .github_api import GithubAPI, RepoInfo
+    from .feishu_api import FeishuAPI
+
+__getattr__ = lazy_exports(
+    __name__,
+    {"GithubAPI": ".github_api", "RepoInfo": ".github_api", "FeishuAPI": ".feishu_api"},
+)
+
+__all__ = ["GithubAPI", "RepoInfo", "FeishuAPI"]
@@ -1,25 +1,50 @@
 #!/usr/bin/env python3
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
 from dataclasses import dataclass
 from datetime import datetime
 import hashlib
 import hmac
 import base64
 import json
+import time
+from typing import Dict, Hashable, Iterator, TypeVar
 
 import requests
 from loguru import logger
 
-from uglygpt.utils import config
+from uglygpt.utils import TokenBucket, config, tracer
+from .session import create_session
+
+K = TypeVar("K", bound=Hashable)
+
+# 机器人发送过于频繁时返回的错误码，稍后重试即可
+RATE_LIMIT_CODES = {9499, 11232}
+
+
+class FeishuError(Exception):
+    """An error code returned by the Feishu bot webhook."""
+
+    def __init__(self, code: int, msg: str):
+        super().__init__(msg)
+        self.code = code
 
 
 @dataclass
 class FeishuAPI:
     bot_webhook: str = config.feishu_webhook
     secret: str = config.feishu_secret
+    timeout = config.http_timeout
+    session = create_session()
+    rate_limiter = TokenBucket(
+        rate=config.feishu_rate_limit / 60, capacity=config.feishu_burst
+    )
 
     @classmethod
     def post(cls, message: str | dict):
+        # 等待限流之后再签名，避免时间戳过期
+        cls.rate_limiter.acquire()
         timestamp = int(datetime.now().timestamp())
         if isinstance(message, dict):
             data = {
@@ -36,12 +61,15 @@ class FeishuAPI:
                 "content": {"text": message},
             }
         try:
-            response = requests.post(
+            response = cls.session.post(
                 cls.bot_webhook,
                 headers={"Content-Type": "application/json"},
                 data=json.dumps(data),
+                timeout=cls.timeout,
             )
-            # response.raise_for_status()
+            # 其他错误的详情在返回的 code 里
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
         except requests.exceptions.RequestException as e:
             logger.error(f"An error occurred: {e}")
             raise
@@ -50,7 +78,76 @@ class FeishuAPI:
         if result.get("code") != 0:
             logger.debug(result)
             logger.error(f"An error occurred: {result['msg']}")
-            raise Exception(result["msg"])
+            raise FeishuError(result.get("code"), result["msg"])
+
+    @classmethod
+    def deliver(
+        cls,
+        messages: Dict[K, str | dict],
+        max_workers: int = config.feishu_concurrency,
+        retries: int = 3,
+        backoff: float = 2,
+    ) -> Iterator[K]:
+        """Posts the messages concurrently, retrying failed ones.
+
+        Every post goes through the bot's rate limit. A message that fails
+        on the network, on a server error or on the bot's rate limit is
+        retried with exponential backoff; other failures, such as a missing
+        webhook or a bad signature, are not. A message that still fails is
+        logged and skipped without stopping the others.
+
+        Args:
+            messages: The messages to post, keyed by any id of the caller.
+            max_workers: The most posts in flight at once.
+            retries: The retries of a failed message.
+            backoff: The seconds to wait before the first retry.
+
+        Yields:
+            The key of every message posted, as soon as it succeeds.
+        """
+        if not messages:
+            return
+        with ThreadPoolExecutor(max_workers) as executor:
+            futures = {
+                executor.submit(
+                    copy_context().run, cls._post_with_retry, message, retries, backoff
+                ): key
+                for key, message in messages.items()
+            }
+            for future in as_completed(futures):
+                if future.result():
+                    yield futures[future]
+                else:
+                    logger.error(f"Feishu message {futures[future]} dropped.")
+
+    @classmethod
+    def _post_with_retry(
+        cls, message: str | dict, retries: int, backoff: float
+    ) -> bool:
+        with tracer.span("feishu.post") as span:
+            for attempt in range(retries + 1):
+                span.set("retries", attempt)
+                try:
+                    cls.post(message)
+                    span.set("delivered", True)
+                    return True
+                except Exception as e:
+                    if attempt == retries or not cls._retryable(e):
+                        break
+                    wait = backoff * 2**attempt
+                    logger.warning(f"Feishu post failed ({e}), retry in {wait:.1f}s.")
+                    time.sleep(wait)
+            span.set("delivered", False)
+            return False
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        if isinstance(error, FeishuError):
+            return error.code in RATE_LIMIT_CODES
+        # 地址为空或格式不对（MissingSchema 等）时重试也没用
+        if isinstance(error, ValueError):
+            return False
+        return isinstance(error, requests.exceptions.RequestException)
 
     @classmethod
     def gen_sign(cls, timestamp):
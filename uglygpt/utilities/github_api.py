@@ -1,64 +1,281 @@
 #!/usr/bin/env python3
 # -*-coding:utf-8-*-
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextvars import copy_context
+from dataclasses import dataclass, field
 import base64
 from datetime import datetime, timedelta
-from typing import Generator
+import json
+from typing import Generator, Iterable
 from urllib.parse import urlparse
 
 import requests
 from loguru import logger
 
-from uglygpt.utils import File, config
+from uglygpt.utils import File, config, tracer
+from .session import create_session
+from .http_cache import HttpCache
+from .rate_limiter import RateLimiter
+
+REPO_FIELDS = """
+fragment RepoFields on Repository {
+  nameWithOwner
+  description
+  stargazerCount
+  repositoryTopics(first: 20) { nodes { topic { name } } }
+  readme: object(expression: "HEAD:README.md") { ... on Blob { oid text } }
+}
+"""
+# 已知版本的 README 先只查 oid，有变化时才下载正文
+REPO_OIDS = REPO_FIELDS.replace("{ oid text }", "{ oid }")
+
+
+@dataclass
+class RepoInfo:
+    name: str
+    description: str = ""
+    stars: int = 0
+    topics: list[str] = field(default_factory=list)
+    readme: str | None = None
+    readme_sha: str | None = None
 
 
 @dataclass
 class GithubAPI:
     token = config.github_token
+    base_url = config.github_api
+    timeout = config.http_timeout
+    session = create_session()
+    cache = HttpCache()
+    rate_limiter = RateLimiter()
+    graphql_batch = 25
 
     @classmethod
-    def _github_api(cls, url: str, params: dict | None = None):
-        url = f"https://api.github.com/{url}"
+    def _request(
+        cls, method: str, url: str, resource: str = "core", **kwargs
+    ) -> requests.Response:
+        with tracer.span(
+            "github.request", method=method, url=url, resource=resource
+        ) as span:
+            attempt = 0
+            while True:
+                cls.rate_limiter.acquire(resource)
+                response = cls.session.request(
+                    method, url, timeout=cls.timeout, **kwargs
+                )
+                if not cls.rate_limiter.update(response, attempt):
+                    break
+                attempt += 1
+            span.set("status", response.status_code)
+            span.set("bytes", len(response.content))
+            span.set("retries", attempt)
+            response.raise_for_status()
+            return response
+
+    @classmethod
+    def _github_api(
+        cls, url: str, params: dict | None = None, headers: dict | None = None
+    ):
+        url = f"{cls.base_url}/{url}"
         logger.debug(f"Fetching {url}")
         try:
-            response = requests.get(
-                url, headers={"Authorization": f"token {cls.token}"}, params=params
+            return cls._request(
+                "GET",
+                url,
+                headers={"Authorization": f"token {cls.token}", **(headers or {})},
+                params=params,
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"An error occurred: {e}")
+            raise
+
+    @classmethod
+    def _graphql(cls, query: str) -> dict:
+        url = f"{cls.base_url}/graphql"
+        logger.debug(f"Querying {url}")
+        try:
+            response = cls._request(
+                "POST",
+                url,
+                resource="graphql",
+                headers={"Authorization": f"bearer {cls.token}"},
+                json={"query": query},
             )
-            response.raise_for_status()
-            return response
         except requests.exceptions.RequestException as e:
             logger.error(f"An error occurred: {e}")
             raise
+        result = response.json()
+        # 部分仓库不存在时 GitHub 仍会返回其余仓库的数据
+        for error in result.get("errors", []):
+            logger.warning(f"GraphQL error: {error.get('message')}")
+        return result.get("data") or {}
+
+    @classmethod
+    def fetch_repos(
+        cls, repo_names: list[str], with_readme: bool = True
+    ) -> dict[str, RepoInfo]:
+        """Fetches metadata and README of many repos in one GraphQL round trip.
+
+        Args:
+            repo_names: The full names of the repos, at most a few dozen.
+            with_readme: Whether to fetch the README text, or only its sha.
+
+        Returns:
+            The repos found, keyed by the requested full name.
+        """
+        aliases = []
+        for i, name in enumerate(repo_names):
+            owner, _, repo = name.partition("/")
+            aliases.append(
+                f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)})"
+                " { ...RepoFields }"
+            )
+        fragment = REPO_FIELDS if with_readme else REPO_OIDS
+        data = cls._graphql("query {\n" + "\n".join(aliases) + "\n}\n" + fragment)
+        repos = {}
+        for i, name in enumerate(repo_names):
+            node = data.get(f"r{i}")
+            if not node:
+                continue
+            readme = node.get("readme") or {}
+            repos[name] = RepoInfo(
+                name=node["nameWithOwner"],
+                description=node.get("description") or "",
+                stars=node.get("stargazerCount", 0),
+                topics=[
+                    n["topic"]["name"] for n in node["repositoryTopics"]["nodes"]
+                ],
+                readme=readme.get("text"),
+                readme_sha=readme.get("oid"),
+            )
+        return repos
+
+    @classmethod
+    def _fetch_content(cls, url: str) -> tuple[str, str] | None:
+        """Fetches a contents API payload through the conditional request cache.
+
+        Returns:
+            The decoded content and its blob sha, None if there is no content.
+        """
+        # 按完整地址缓存，指向其他服务器（如测试桩）时不会串用
+        key = f"{cls.base_url}/{url}"
+        cached = cls.cache.get(key)
+        response = cls._github_api(url, headers=HttpCache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.debug(f"{url} not modified.")
+            return cached["content"], cached["sha"]
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        content = base64.b64decode(data["content"]).decode("utf-8")
+        cls.cache.set(
+            key,
+            {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "sha": data.get("sha", ""),
+                "content": content,
+            },
+        )
+        return content, data.get("sha", "")
 
     @classmethod
     def fetch_readme(cls, repo_name: str) -> str | None:
+        readme = cls.fetch_readme_with_sha(repo_name)
+        return readme[0] if readme else None
+
+    @classmethod
+    def fetch_readme_with_sha(cls, repo_name: str) -> tuple[str, str] | None:
         url = f"repos/{repo_name}/readme"
         try:
-            response = cls._github_api(url)
+            return cls._fetch_content(url)
         except requests.exceptions.HTTPError:
             logger.warning(f"Repo {repo_name} has no README.")
             return None
-        if response.status_code == 200:
-            content = base64.b64decode(response.json()["content"]).decode("utf-8")
-            return content
-        else:
-            return None
 
     @classmethod
-    def fetch_starred_repos(
-        cls, username: str = "uglyboy-tl"
-    ) -> Generator[str, None, None]:
-        url = f"users/{username}/starred"
-        params = {"per_page": 100}
+    def fetch_readmes(
+        cls,
+        repo_names: Iterable[str],
+        max_workers: int = config.http_pool_size,
+        graphql: bool = config.github_graphql,
+        known: dict[str, str] | None = None,
+    ) -> Generator[tuple[str, str | None, str | None], None, None]:
+        """Fetches READMEs concurrently, yielding each one as soon as it arrives.
+
+        Args:
+            repo_names: The full names of the repos.
+            max_workers: The maximum number of requests in flight.
+            graphql: Whether to fetch `README.md` in GraphQL batches first,
+                repos without one fall back to the REST API.
+            known: The README sha already seen for some repos. With GraphQL
+                only their sha is queried, and the text is downloaded through
+                the cached REST API when it changed.
+
+        Yields:
+            `(repo_name, readme, sha)` in completion order. `readme` and `sha`
+            are None if the repo has no README; `readme` alone is None if
+            `sha` equals `known[repo_name]` and the text was not downloaded.
+        """
+        repo_names = list(repo_names)
+        known = known or {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if graphql:
+                batches = {}
+                for names, with_readme in (
+                    ([n for n in repo_names if n not in known], True),
+                    ([n for n in repo_names if n in known], False),
+                ):
+                    for i in range(0, len(names), cls.graphql_batch):
+                        batch = names[i : i + cls.graphql_batch]
+                        future = executor.submit(
+                            copy_context().run, cls.fetch_repos, batch, with_readme
+                        )
+                        batches[future] = batch
+                repo_names = []
+                for future in as_completed(batches):
+                    try:
+                        repos = future.result()
+                    except requests.exceptions.RequestException:
+                        repos = {}
+                    for name in batches[future]:
+                        repo = repos.get(name)
+                        if repo and name in known and repo.readme_sha == known[name]:
+                            yield name, None, repo.readme_sha
+                        elif repo and repo.readme is not None:
+                            yield name, repo.readme, repo.readme_sha
+                        else:
+                            # 没有 README.md、或已知的 README 有变化，走带缓存的 REST 接口
+                            repo_names.append(name)
+            futures = {
+                executor.submit(
+                    copy_context().run, cls.fetch_readme_with_sha, name
+                ): name
+                for name in repo_names
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    readme = future.result()
+                except requests.exceptions.RequestException:
+                    readme = None
+                if readme is None:
+                    yield name, None, None
+                else:
+                    yield name, *readme
+
+    @classmethod
+    def _paginate(
+        cls, url: str, params: dict | None = None, headers: dict | None = None
+    ) -> Generator[dict, None, None]:
         while True:
-            response = cls._github_api(str(url), params=params)
+            response = cls._github_api(str(url), params=params, headers=headers)
             items = response.json()
             link = response.headers.get("Link", "")
             if not items:
                 break
-            for item in items:
-                yield item["full_name"]
+            yield from items
             if 'rel="next"' not in link:
                 break
             for link in link.split(","):
@@ -66,6 +283,38 @@ class GithubAPI:
                     full_url = link.strip().split(";")[0].strip("<>")
                     parsed = urlparse(full_url)
                     url = (parsed.path + "?" + parsed.query).lstrip("/")
+                    # 下一页链接里已经带上了查询参数
+                    params = None
+
+    @classmethod
+    def fetch_starred_repos(
+        cls, username: str = "uglyboy-tl"
+    ) -> Generator[str, None, None]:
+        url = f"users/{username}/starred"
+        for item in cls._paginate(url, params={"per_page": 100}):
+            yield item["full_name"]
+
+    @classmethod
+    def fetch_starred_since(
+        cls, username: str = "uglyboy-tl", since: str | None = None
+    ) -> Generator[tuple[str, str], None, None]:
+        """Fetches the starred repos, newest first, down to a checkpoint.
+
+        Args:
+            username: The user whose stars are fetched.
+            since: The `starred_at` of the newest star already synced, in
+                ISO 8601 as returned by GitHub. None fetches every star.
+
+        Yields:
+            `(repo_name, starred_at)` of the stars newer than `since`.
+        """
+        url = f"users/{username}/starred"
+        params = {"per_page": 100, "sort": "created", "direction": "desc"}
+        headers = {"Accept": "application/vnd.github.star+json"}
+        for item in cls._paginate(url, params=params, headers=headers):
+            if since and item["starred_at"] <= since:
+                break
+            yield item["repo"]["full_name"], item["starred_at"]
 
     @classmethod
     def fetch_trending_file(cls) -> str:
@@ -90,16 +339,11 @@ class GithubAPI:
     def fetch_file(cls, repo_name: str, file_path: str) -> str:
         url = f"repos/{repo_name}/contents/{file_path}"
         try:
-            response = cls._github_api(url)
+            content = cls._fetch_content(url)
         except requests.exceptions.HTTPError:
             logger.error(f"Repo {repo_name} has no {file_path}.")
             raise
         except requests.exceptions.RequestException as e:
             logger.error(f"An error occurred: {e}")
             raise
-
-        if response.status_code == 200:
-            content = base64.b64decode(response.json()["content"]).decode("utf-8")
-            return content
-        else:
-            return ""
+        return content[0] if content else ""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass, field
+from hashlib import sha1
+import json
+import os
+import threading
+import time
+
+from loguru import logger
+
+from uglygpt.utils import File, config
+
+
+@dataclass
+class HttpCache:
+    """An on-disk cache of HTTP responses keyed by URL.
+
+    Each entry is a JSON file holding the validators (`etag`,
+    `last_modified`) of the response together with whatever payload the
+    caller wants to keep, so a `304 Not Modified` can be answered locally.
+
+    Reading an entry refreshes its modification time. Entries unused for
+    `ttl_days` are dropped, and beyond `max_entries` the least recently used
+    ones are evicted; `prune` runs every `prune_every` writes.
+    """
+
+    directory: str = config.http_cache
+    ttl_days: float = config.http_cache_days
+    max_entries: int = config.http_cache_entries
+    prune_every: int = 100
+    writes: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> dict | None:
+        file_path = self._path(url)
+        try:
+            if time.time() - file_path.stat().st_mtime > self.ttl_days * 86400:
+                file_path.unlink(missing_ok=True)
+                return None
+            entry = json.loads(file_path.read_text())
+            os.utime(file_path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f"Broken cache entry for {url}, ignored.")
+            return None
+
+    def set(self, url: str, entry: dict) -> None:
+        file_path = self._path(url)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免并发读到写了一半的内容
+        tmp_path = file_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=False))
+        os.replace(tmp_path, file_path)
+        with self._lock:
+            self.writes += 1
+            prune = (self.writes - 1) % self.prune_every == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drops the expired entries and evicts the least recently used ones."""
+        directory = File.to_path(self.directory)
+        if not directory.exists():
+            return
+        now = time.time()
+        entries = []
+        for file_path in directory.glob("*.json"):
+            try:
+                mtime = file_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if now - mtime > self.ttl_days * 86400:
+                file_path.unlink(missing_ok=True)
+            else:
+                entries.append((mtime, file_path))
+        entries.sort(reverse=True)
+        for _, file_path in entries[self.max_entries :]:
+            file_path.unlink(missing_ok=True)
+        kept = min(len(entries), self.max_entries)
+        logger.debug(f"HTTP cache pruned to {kept} entries.")
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _path(self, url: str):
+        return File.to_path(self.directory) / f"{sha1(url.encode()).hexdigest()}.json"
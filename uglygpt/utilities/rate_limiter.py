@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass, field
+import threading
+import time
+
+import requests
+from loguru import logger
+
+
+@dataclass
+class Quota:
+    limit: int = 0
+    remaining: int | None = None
+    reset: float = 0
+    used: int = 0
+
+
+@dataclass
+class RateLimiter:
+    """A scheduler that keeps GitHub requests inside their rate limit.
+
+    The quota of every resource (`core`, `graphql`, ...) is tracked from the
+    `X-RateLimit-*` headers. It is spent freely while plenty is left; once it
+    drops below `pace_ratio` of the limit, the remaining requests are spread
+    evenly over the time left before the reset, like a token bucket refilled
+    at `remaining / (reset - now)`. Secondary rate limits (403/429 with
+    `Retry-After`) pause every caller and back off exponentially.
+
+    Attributes:
+        pace_ratio: The share of the quota below which requests are paced.
+        backoff: The base backoff in seconds when GitHub gives no hint.
+        max_retries: The number of throttled retries before giving up.
+    """
+
+    pace_ratio: float = 0.1
+    backoff: float = 60
+    max_retries: int = 5
+    request_count: int = field(init=False, default=0)
+    retries: int = field(init=False, default=0)
+    throttled: float = field(init=False, default=0)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._quotas: dict[str, Quota] = {}
+        self._next: dict[str, float] = {}
+        self._blocked_until = 0.0
+
+    def acquire(self, resource: str = "core") -> None:
+        """Blocks until a request against `resource` may be sent."""
+        with self._lock:
+            now = time.time()
+            quota = self._quotas.setdefault(resource, Quota())
+            wait = max(0.0, self._blocked_until - now)
+            if quota.remaining is not None and quota.reset > now:
+                if quota.remaining <= 0:
+                    wait = max(wait, quota.reset - now)
+                elif quota.remaining < quota.limit * self.pace_ratio:
+                    interval = (quota.reset - now) / quota.remaining
+                    start = max(now + wait, self._next.get(resource, 0))
+                    self._next[resource] = start + interval
+                    wait = start - now
+                quota.remaining -= 1
+            self.request_count += 1
+        self._sleep(wait, f"Pacing {resource} requests")
+
+    def update(self, response: requests.Response, attempt: int = 0) -> float:
+        """Records the quota reported by a response.
+
+        Args:
+            response: The response to a request made after `acquire`.
+            attempt: The number of throttled retries so far.
+
+        Returns:
+            The seconds to wait before retrying, 0 if the response was not
+            throttled or the retries are used up.
+        """
+        headers = response.headers
+        resource = headers.get("X-RateLimit-Resource", "core")
+        with self._lock:
+            quota = self._quotas.setdefault(resource, Quota())
+            if "X-RateLimit-Remaining" in headers:
+                quota.limit = int(headers.get("X-RateLimit-Limit", quota.limit))
+                quota.remaining = int(headers["X-RateLimit-Remaining"])
+                quota.reset = float(headers.get("X-RateLimit-Reset", 0))
+            if response.status_code != 304:
+                quota.used += 1
+        if response.status_code not in (403, 429) or attempt >= self.max_retries:
+            return 0
+        if "Retry-After" in headers:
+            wait = float(headers["Retry-After"])
+        elif quota.remaining == 0:
+            wait = max(0.0, quota.reset - time.time()) + 1
+        elif response.status_code == 429 or "rate limit" in response.text.lower():
+            wait = self.backoff * 2**attempt
+        else:
+            # 真正的无权限错误，不需要重试
+            return 0
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.time() + wait)
+            self.retries += 1
+        logger.warning(f"Github rate limit hit, retry in {wait:.1f}s.")
+        return wait
+
+    def stats(self) -> dict:
+        """Returns the requests made, retries and quota used since creation."""
+        with self._lock:
+            return {
+                "requests": self.request_count,
+                "retries": self.retries,
+                "throttled": round(self.throttled, 1),
+                "quota_used": {k: v.used for k, v in self._quotas.items()},
+                "quota_remaining": {k: v.remaining for k, v in self._quotas.items()},
+            }
+
+    def _sleep(self, seconds: float, reason: str) -> None:
+        if seconds <= 0:
+            return
+        logger.debug(f"{reason}, sleep {seconds:.1f}s.")
+        with self._lock:
+            self.throttled += seconds
+        time.sleep(seconds)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from uglygpt.utils import config
+
+RETRY_STATUS = (500, 502, 503, 504)
+
+
+def create_session(
+    pool_size: int = config.http_pool_size,
+    retries: int = config.http_retries,
+    backoff: float = config.http_backoff,
+) -> requests.Session:
+    """Creates a keep-alive session with a shared connection pool.
+
+    Connections are reused across requests to the same host, so only the
+    first request pays for the TCP and TLS handshake. Idempotent requests
+    are retried with exponential backoff on connection errors and 5xx.
+
+    Args:
+        pool_size: The maximum number of connections kept per host.
+        retries: The number of retries for a failed request.
+        backoff: The backoff factor between retries, in seconds.
+
+    Returns:
+        The configured session.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,9 +1,59 @@
 #!/usr/bin/env python3
 # -*-coding:utf-8-*-
 
+from typing import TYPE_CHECKING
+
+# config 同名的子模块会覆盖包上的属性，所以直接导入（它本身很轻）
 from .config import config
-from .file import File, ProjectRootNotFoundError, FileNotFoundInWorkspaceError
-from .parse import parse_code, parse_json, parse_markdown
+from .lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .file import File, ProjectRootNotFoundError, FileNotFoundInWorkspaceError
+    from .parse import (
+        TrendingRepo,
+        parse_code,
+        parse_json,
+        parse_markdown,
+        parse_trending,
+        repair_json,
+    )
+    from .markdown import clean_markdown
+    from .stream import CodeStream, JsonStream, parse_stream
+    from .storage import Database, SQLiteStorage, transaction
+    from .token_bucket import TokenBucket
+    from .trace import Span, Tracer, tracer
+    from .tokens import context_size, count_tokens, model_name, split_tokens
+
+# 其余的名字在第一次使用时才导入对应模块，uglychain 等重依赖不会拖慢启动
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "File": ".file",
+        "ProjectRootNotFoundError": ".file",
+        "FileNotFoundInWorkspaceError": ".file",
+        "parse_code": ".parse",
+        "parse_json": ".parse",
+        "parse_markdown": ".parse",
+        "parse_trending": ".parse",
+        "repair_json": ".parse",
+        "TrendingRepo": ".parse",
+        "CodeStream": ".stream",
+        "JsonStream": ".stream",
+        "parse_stream": ".stream",
+        "Database": ".storage",
+        "SQLiteStorage": ".storage",
+        "transaction": ".storage",
+        "TokenBucket": ".token_bucket",
+        "clean_markdown": ".markdown",
+        "context_size": ".tokens",
+        "count_tokens": ".tokens",
+        "model_name": ".tokens",
+        "split_tokens": ".tokens",
+        "Span": ".trace",
+        "Tracer": ".trace",
+        "tracer": ".trace",
+    },
+)
 
 __all__ = [
     "config",
@@ -13,4 +63,22 @@ __all__ = [
     "parse_code",
     "parse_json",
     "parse_markdown",
+    "parse_trending",
+    "repair_json",
+    "TrendingRepo",
+    "CodeStream",
+    "JsonStream",
+    "parse_stream",
+    "Database",
+    "SQLiteStorage",
+    "transaction",
+    "TokenBucket",
+    "clean_markdown",
+    "context_size",
+    "count_tokens",
+    "model_name",
+    "split_tokens",
+    "Span",
+    "Tracer",
+    "tracer",
 ]
@@ -13,8 +13,26 @@ from .singleton import singleton
 class Config:
     # Github
     github_token: Optional[str] = os.getenv("GITHUB_TOKEN")
+    github_api: str = os.getenv("GITHUB_API", "https://api.github.com")
+    github_graphql: bool = os.getenv("GITHUB_GRAPHQL", "true").lower() == "true"
     feishu_webhook: Optional[str] = os.getenv("FEISHU_WEBHOOK")
     feishu_secret: Optional[str] = os.getenv("FEISHU_SECRET")
+    # 飞书自定义机器人限流为 100 次/分钟、5 次/秒
+    feishu_rate_limit: int = int(os.getenv("FEISHU_RATE_LIMIT", "100"))
+    feishu_burst: int = int(os.getenv("FEISHU_BURST", "5"))
+    feishu_concurrency: int = int(os.getenv("FEISHU_CONCURRENCY", "4"))
+    # HTTP
+    http_pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "16"))
+    http_timeout: float = float(os.getenv("HTTP_TIMEOUT", "30"))
+    http_retries: int = int(os.getenv("HTTP_RETRIES", "3"))
+    http_backoff: float = float(os.getenv("HTTP_BACKOFF", "0.5"))
+    http_cache: str = os.getenv("HTTP_CACHE", "data/github/http_cache")
+    http_cache_days: float = float(os.getenv("HTTP_CACHE_DAYS", "30"))
+    http_cache_entries: int = int(os.getenv("HTTP_CACHE_ENTRIES", "5000"))
+    # 追踪：每个 span 一行 JSON，为空时不输出
+    trace_file: str = os.getenv("TRACE_FILE", "")
+    # LLM
+    llm_cache: str = os.getenv("LLM_CACHE", "data/cache/llm.db")
 
 
 config = Config()
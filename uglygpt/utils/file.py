@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 # -*-coding:utf-8-*-
 
+from contextlib import contextmanager
 from datetime import datetime
 from loguru import logger
 from pathlib import Path
 from shutil import copy2
-from tenacity import retry, stop_after_attempt, wait_fixed
+from typing import Iterator, Optional, TextIO
+import os
 
 
 class ProjectRootNotFoundError(Exception):
@@ -16,12 +18,33 @@ class FileNotFoundInWorkspaceError(Exception):
     pass
 
 
-class File:
-    WORKSPACE_ROOT: Path
+class _Workspace(type):
+    """Finds `File.WORKSPACE_ROOT` on first use instead of at import."""
 
+    _root: Optional[Path] = None
+
+    @property
+    def WORKSPACE_ROOT(cls) -> Path:
+        if cls._root is None:
+            cls._root = cls.get_project_root(__file__)
+        return cls._root
+
+    @WORKSPACE_ROOT.setter
+    def WORKSPACE_ROOT(cls, root: Path) -> None:
+        cls._root = root
+
+
+class File(metaclass=_Workspace):
     @classmethod
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(1))
     def save(cls, filename: str | Path, data: str) -> None:
+        from tenacity import retry, stop_after_attempt, wait_fixed
+
+        retry(stop=stop_after_attempt(3), wait=wait_fixed(1))(cls._save)(
+            filename, data
+        )
+
+    @classmethod
+    def _save(cls, filename: str | Path, data: str) -> None:
         file_path = cls.to_path(filename)
         if file_path.exists():
             cls._backup(file_path)
@@ -41,6 +64,25 @@ class File:
             f.write(data)
         logger.debug(f"追加数据至 `{file_path}`")
 
+    @classmethod
+    @contextmanager
+    def stream(cls, filename: str | Path) -> Iterator[TextIO]:
+        """Writes a file incrementally and atomically replaces the old one.
+
+        The content goes to a `.tmp` sibling that is renamed into place only
+        after the block exits without error. If it fails, the old file is
+        untouched and the `.tmp` file keeps whatever was written so far.
+        """
+        file_path = cls.to_path(filename)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            yield f
+        if file_path.exists():
+            cls._backup(file_path, link=True)
+        os.replace(tmp_path, file_path)
+        logger.debug(f"保存文件至 `{file_path}`")
+
     @classmethod
     def load(cls, filename: str | Path):
         file_path = cls.to_path(filename)
@@ -102,11 +144,16 @@ class File:
         return file_path if file_path.is_absolute() else cls.WORKSPACE_ROOT / filename
 
     @classmethod
-    def _backup(cls, file_path: Path):
+    def _backup(cls, file_path: Path, link: bool = False):
         backup_path = file_path.with_suffix(
             file_path.suffix + "." + datetime.now().strftime("%Y%m%d%H%M%S") + ".bak"
         )
+        # 原文件随后会被整体替换时，硬链接即可保留旧内容，不必复制
+        if link:
+            try:
+                os.link(file_path, backup_path)
+                return
+            except OSError:
+                pass
         copy2(file_path, backup_path)
 
-
-File.WORKSPACE_ROOT = File.get_project_root(__file__)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from importlib import import_module
+import sys
+from typing import Any, Callable, Dict
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Callable[[str], Any]:
+    """Returns a PEP 562 module `__getattr__` that imports exports on use.
+
+    `exports` maps every public name to the relative module that defines it.
+    The first access imports that module and caches the value on the
+    package, so later lookups never reach `__getattr__` again.
+
+    Parameters:
+        package: The `__name__` of the package.
+        exports: The public names and the modules they come from.
+
+    Returns:
+        The `__getattr__` to assign in the package `__init__`.
+    """
+
+    def __getattr__(name: str) -> Any:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(import_module(exports[name], package), name)
+        setattr(sys.modules[package], name, value)
+        return value
+
+    return __getattr__
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+import re
+
+CODE_FENCE = re.compile(r"^(`{3,}|~{3,})[^\n]*\n.*?^\1[ \t]*$", re.M | re.S)
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.S)
+BADGE = re.compile(r"\[!\[[^\]]*\]\([^)]*\)\]\([^)]*\)")
+IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+HTML_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+REFERENCE = re.compile(r"^\s*\[[^\]]+\]:\s*\S+.*$", re.M)
+BLANK_LINES = re.compile(r"\n\s*\n(\s*\n)+")
+
+
+def clean_markdown(markdown_text: str) -> str:
+    """
+    Strip the parts of a markdown document that carry no meaning for an LLM.
+
+    Removes code blocks, HTML comments and tags, badges, images and link
+    reference definitions, then collapses runs of blank lines.
+
+    Parameters:
+    markdown_text (str): The markdown text, e.g. a README.
+
+    Returns:
+    str: The cleaned text.
+    """
+    text = CODE_FENCE.sub("", markdown_text)
+    text = HTML_COMMENT.sub("", text)
+    text = BADGE.sub("", text)
+    text = IMAGE.sub("", text)
+    text = HTML_TAG.sub("", text)
+    text = REFERENCE.sub("", text)
+    text = BLANK_LINES.sub("\n\n", text)
+    return text.strip()
@@ -3,11 +3,40 @@
 
 import re
 import json
-from typing import Dict
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
 
 from loguru import logger
 
-from uglychain import LLM
+
+FENCE = "```"
+WHITESPACE = re.compile(r"\s")
+# 代码块开头那一行剩下的空白
+FENCE_LINE_END = re.compile(r"[ \t]*(?:\r?\n)+")
+
+
+def _fenced(text: str, fence: str, terminated: bool = True) -> Optional[str]:
+    """Finds the body of the block opened by the first `fence`.
+
+    The block runs to the last ``` of the text, or to the end of the text if
+    `terminated` is False. Only `str.find` and anchored matches are used, so
+    the scan is linear.
+    """
+    start = text.find(fence)
+    if start < 0:
+        return None
+    # 语言名之后的第一个空白处是代码的开始
+    space = WHITESPACE.search(text, start + len(fence))
+    if space is None:
+        return None
+    begin = space.start()
+    end = text.rfind(FENCE, begin) if terminated else len(text)
+    if end <= begin:
+        return None
+    match = FENCE_LINE_END.match(text, begin, end)
+    if match:
+        begin = match.end()
+    return text[begin:end].rstrip()
 
 
 def parse_code(text: str, lang: str = "python"):
@@ -20,76 +49,167 @@ def parse_code(text: str, lang: str = "python"):
     Returns:
         The parsed code.
     """
-    pattern = rf"```{lang}.*?\s+(.*)\s+```"
-    match = re.search(pattern, text, re.DOTALL)
-    if match:
-        code = match.group(1)
-    else:
-        pattern = r"```.*?\s+(.*)\s+```"
-        match = re.search(pattern, text, re.DOTALL)
-        if match:
-            code = match.group(1)
-            logger.warning(f"parse_code: {lang} not match following text:\n{text}")
-        else:
-            match = re.search(pattern, text + "\n```", re.DOTALL)
-            if match:
-                code = match.group(1)
-                logger.warning(
-                    "code in code block not end with ```, we add it automatically."
-                )
+    code = _fenced(text, FENCE + lang)
+    if code is not None:
+        return code
+    code = _fenced(text, FENCE)
+    if code is not None:
+        logger.warning(f"parse_code: {lang} not match following text:\n{text}")
+        return code
+    code = _fenced(text, FENCE, terminated=False)
+    if code is not None:
+        logger.warning("code in code block not end with ```, we add it automatically.")
+        return code
+    logger.warning(f"no code block in following text:\n{text}")
+    raise Exception(f"no code block in following text:\n{text}")
+
+
+JSON_FENCE = re.compile(r"```json(.*?)```", re.DOTALL)
+JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+JSON_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def _end_of_string(text: str, i: int) -> bool:
+    """Tells whether the quote at `i` closes a string, by what follows it."""
+    # 只跳过引号后的空白，每段空白最多被它前面的一个引号扫描一次，整体仍是线性的
+    j = i + 1
+    while j < len(text) and text[j].isspace():
+        j += 1
+    return j == len(text) or text[j] in ",:}]"
+
+
+def repair_json(string: str) -> str:
+    """Repairs the JSON an LLM usually produces, in a single pass.
+
+    The value is taken from the last ```json block if there is one, otherwise
+    from the first `{` or `[`. Trailing commas are dropped, raw newlines and
+    quotes inside strings are escaped, Python literals are converted, text
+    after the value is ignored, and an unterminated string, object or array
+    is closed.
+
+    Args:
+        string: The text containing the JSON.
+
+    Returns:
+        The repaired JSON string, which may still be invalid if the text is
+        too broken.
+    """
+    blocks = JSON_FENCE.findall(string)
+    text = blocks[-1] if blocks else string
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return text.strip()
+
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    i = min(starts)
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(char)
+            elif char == "\\":
+                escape = True
+                out.append(char)
+            elif char == '"':
+                if _end_of_string(text, i):
+                    in_string = False
+                    out.append(char)
+                else:
+                    # 字符串里没有转义的引号
+                    out.append('\\"')
+            elif char in JSON_ESCAPES:
+                out.append(JSON_ESCAPES[char])
+            elif char < " ":
+                out.append(f"\\u{ord(char):04x}")
             else:
-                logger.warning(f"{pattern} not match following text:\n{text}")
-                raise Exception(f"{pattern} not match following text:\n{text}")
-    return code
+                out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            if not stack or stack[-1] != char:
+                # 多余的右括号
+                i += 1
+                continue
+            while out and (out[-1].isspace() or out[-1] == ","):
+                out.pop()
+            out.append(stack.pop())
+            if not stack:
+                break
+        elif char.isalpha() or char == "_":
+            j = i
+            while j < len(text) and (text[j].isalnum() or text[j] == "_"):
+                j += 1
+            word = text[i:j]
+            out.append(JSON_LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    # 输出被截断时，补全未结束的字符串和括号
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    while stack:
+        while out and (out[-1].isspace() or out[-1] == ","):
+            out.pop()
+        if out and out[-1] == ":":
+            out.append("null")
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def _fix_json_with_llm(string: str) -> str:
+    # 只在本地修复失败时才用得到，不必在导入时加载 uglychain
+    from uglychain import LLM
+
+    llm = LLM()
+    message = llm(
+        """Do not change the specific content, fix the json, directly return the repaired JSON, without any explanation and dialogue.\n```\n"""
+        + string
+        + """\n```"""
+    )
+    logger.debug(message)
+    match = JSON_FENCE.findall(message)
+    if match:
+        return match[-1]
+    return message
 
 
 def fix_llm_json_str(string: str):
     """Fixes the JSON string.
 
+    `repair_json` is tried first, the LLM is only asked when its result is
+    still not valid JSON.
+
     Args:
         string: The JSON string to fix.
 
     Returns:
         The fixed JSON string.
     """
-    new_string = re.sub(r",\s*}", "}", string)
-    new_string = re.sub(r",\s*]", "]", new_string)
-    new_string = re.sub(r'"},"\n', '"},\n', new_string)
-    new_string = re.sub(r'"}"\n', '"}\n', new_string)
-    new_string = re.sub(r'}"$', "}", new_string)
+    try:
+        json.loads(string)
+        return string
+    except json.JSONDecodeError:
+        pass
+    new_string = repair_json(string)
     try:
         json.loads(new_string)
         return new_string
-    except Exception as e:
-        logger.warning("fix_llm_json_str failed 1:", e)
-        try:
-            pattern = r"```json(.*?)```"
-            match = re.findall(pattern, new_string, re.DOTALL)
-            if match:
-                new_string = match[-1]
-
-            json.loads(new_string)
-            return new_string
-        except Exception as e:
-            logger.warning("fix_llm_json_str failed 2:", e)
-            try:
-                new_string = new_string.replace("\n", "\\n")
-                json.loads(new_string)
-                return new_string
-            except Exception as e:
-                logger.warning("fix_llm_json_str failed 3:", e)
-                llm = LLM()
-                message = llm(
-                    """Do not change the specific content, fix the json, directly return the repaired JSON, without any explanation and dialogue.\n```\n"""
-                    + new_string
-                    + """\n```"""
-                )
-                logger.debug(message)
-                pattern = r"```json(.*?)```"
-                match = re.findall(pattern, message, re.DOTALL)
-                if match:
-                    return match[-1]
-                return message
+    except json.JSONDecodeError as e:
+        logger.warning(f"repair_json failed: {e}")
+        return _fix_json_with_llm(new_string)
 
 
 def parse_json(string):
@@ -106,7 +226,10 @@ def parse_json(string):
     try:
         return json.loads(fix_llm_json_str(string))
     except Exception as e:
-        raise json.JSONDecodeError(f"parse_json failed: {e}", string, 0)
+        raise json.JSONDecodeError(f"parse_json failed: {e}", str(string), 0) from e
+
+
+MARKDOWN_TITLE = re.compile(r"^## ", re.MULTILINE)
 
 
 def parse_markdown(markdown_text: str) -> Dict[str, str]:
@@ -121,6 +244,59 @@ def parse_markdown(markdown_text: str) -> Dict[str, str]:
     """
     if not isinstance(markdown_text, str):
         raise ValueError("The input markdown_text must be a string.")
-    pattern = r"(?m)^## (.*?)\n(.*?)(?=^## |\Z)"
-    matches = re.findall(pattern, markdown_text, re.DOTALL)
-    return {title: text.strip() for title, text in matches}
+    # 按二级标题的位置切分，不需要回溯
+    starts = [match.start() for match in MARKDOWN_TITLE.finditer(markdown_text)]
+    sections = {}
+    for start, end in zip(starts, starts[1:] + [len(markdown_text)]):
+        newline = markdown_text.find("\n", start, end)
+        if newline < 0:
+            continue
+        sections[markdown_text[start + 3 : newline]] = markdown_text[
+            newline + 1 : end
+        ].strip()
+    return sections
+
+
+TRENDING_REPO = re.compile(r"-\s\[(.*?)\]\((.*?)\)\s-\s(.*)")
+
+
+class TrendingRepo(NamedTuple):
+    name: str
+    url: str
+    description: str
+    language: str
+
+
+@lru_cache(maxsize=8)
+def parse_trending(markdown_text: str) -> Dict[str, Tuple[TrendingRepo, ...]]:
+    """
+    Parse a trending file into the repos of every language in a single pass.
+
+    Results are cached by content, so each day's file is only parsed once.
+
+    Parameters:
+    markdown_text (str): The trending file, one `## <language>` section per
+    language with `- [name](url) - description` lines.
+
+    Returns:
+    dict: The repos of each section, keyed by the section title.
+    """
+    if not isinstance(markdown_text, str):
+        raise ValueError("The input markdown_text must be a string.")
+    sections = {}
+    language = None
+    repos = []
+    for line in markdown_text.splitlines():
+        if line.startswith("## "):
+            if language is not None:
+                sections[language] = tuple(repos)
+            language = line[3:].strip()
+            repos = []
+        elif language is not None:
+            match = TRENDING_REPO.search(line)
+            if match:
+                name, url, description = match.groups()
+                repos.append(TrendingRepo(name, url, description, language))
+    if language is not None:
+        sections[language] = tuple(repos)
+    return sections
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import ContextManager, Dict, Iterable, Iterator, List, Optional, Union
+import sqlite3
+import threading
+
+from uglychain.storage import SQLiteStorage as _SQLiteStorage
+
+# SQLite 默认最多支持 999 个绑定参数
+MAX_VARIABLES = 900
+
+
+@dataclass
+class Database:
+    """A SQLite connection shared by several tables, with batched commits.
+
+    The connection runs in WAL mode and can be used from any thread, every
+    statement runs under a lock. Writes are committed immediately unless they
+    happen inside `transaction()`, in which case everything written until the
+    outermost block exits is committed at once, or rolled back if an
+    exception escapes it.
+
+    A transaction holds the lock until it exits, so other threads wait
+    instead of writing into it; keep the blocks short and free of network
+    calls.
+    """
+
+    file: str
+
+    def __post_init__(self):
+        self._conn = sqlite3.connect(Path(self.file), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def table(self, name: str, expirationIntervalInDays: int = 10) -> "SQLiteStorage":
+        return SQLiteStorage(self.file, name, expirationIntervalInDays, self)
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        # 整个事务期间持有锁，其他线程的写入不会混进来，回滚时也不会被一起撤销
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                # 内层的异常若被调用方处理掉，只由最外层决定提交还是回滚
+                if self._depth == 0:
+                    self._conn.rollback()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.commit()
+
+    def execute(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        with self._lock:
+            rows = self._conn.execute(sql, tuple(params)).fetchall()
+            if self._depth == 0 and self._conn.in_transaction:
+                self._conn.commit()
+            return rows
+
+    def executemany(self, sql: str, rows: Iterable[Iterable]) -> None:
+        with self._lock:
+            self._conn.executemany(sql, rows)
+            if self._depth == 0:
+                self._conn.commit()
+
+
+@dataclass
+class SQLiteStorage(_SQLiteStorage):
+    """A `SQLiteStorage` backed by a shared `Database`.
+
+    Storages created with the same `database` share its connection and its
+    transactions; without one, a private `Database` is opened. Safe to use
+    from worker threads.
+    """
+
+    database: Optional[Database] = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.database is None:
+            self.database = Database(self.file)
+        self.database.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT, timestamp TEXT Not NULL DEFAULT (date('now','localtime')))"
+        )
+
+    def save(self, data: Dict[str, str]):
+        if not data:
+            return
+        assert self.database
+        self.database.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+            data.items(),
+        )
+
+    def load(
+        self,
+        keys: Optional[Union[List[str], str]] = None,
+        condition: Optional[str] = None,
+    ) -> Dict[str, str]:
+        assert self.database
+        query_sql = f"SELECT key, value FROM {self.table} WHERE date('now', 'localtime') < date(timestamp, '+' || ? || ' day')"
+        if condition is not None:
+            query_sql += f" and {condition}"
+        params = [str(self.expirationIntervalInDays)]
+        if keys is None:
+            return dict(self.database.execute(query_sql, params))
+        if isinstance(keys, str):
+            keys = [keys]
+
+        # 主键上的 IN 查询，参数过多时分批
+        keys = list(dict.fromkeys(keys))
+        result = {}
+        for i in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[i : i + MAX_VARIABLES]
+            placeholders = ", ".join("?" for _ in chunk)
+            result.update(
+                self.database.execute(
+                    f"{query_sql} and key IN ({placeholders})", params + chunk
+                )
+            )
+        return result
+
+    def group(
+        self,
+        keys: Optional[List[str]] = None,
+        condition: Optional[str] = None,
+    ) -> Dict[str, List[str]]:
+        """Groups the keys by their value.
+
+        With `keys`, they are loaded by primary key and grouped in Python;
+        without, the whole table is read sorted by value.
+
+        Args:
+            keys: The keys to group, all keys if None.
+            condition: An extra SQL condition, as in `load`.
+
+        Returns:
+            The keys of each value, in the order of `keys` when given. Every
+            key appears once.
+        """
+        assert self.database
+        if keys is not None:
+            rows = self.load(keys, condition)
+            groups: Dict[str, List[str]] = {}
+            for key in dict.fromkeys(keys):
+                if key in rows:
+                    groups.setdefault(rows[key], []).append(key)
+            return groups
+        query_sql = f"SELECT value, key FROM {self.table} WHERE date('now', 'localtime') < date(timestamp, '+' || ? || ' day')"
+        if condition is not None:
+            query_sql += f" and {condition}"
+        groups = {}
+        for value, key in self.database.execute(
+            query_sql + " ORDER BY value", [str(self.expirationIntervalInDays)]
+        ):
+            groups.setdefault(value, []).append(key)
+        return groups
+
+
+def transaction(storage) -> ContextManager:
+    """Groups the writes made in the block into one transaction of `storage`.
+
+    The writes to every table of the same `Database` are included. Storages
+    without a `Database` write as usual.
+    """
+    database = getattr(storage, "database", None)
+    return database.transaction() if database else nullcontext()
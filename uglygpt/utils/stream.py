@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass, field
+import json
+from typing import Any, Iterable, Optional, Protocol, TypeVar
+
+from loguru import logger
+
+from .parse import parse_json
+
+R = TypeVar("R", covariant=True)
+
+
+class StreamParser(Protocol[R]):
+    def feed(self, chunk: str) -> Optional[R]:
+        ...
+
+    def finish(self) -> R:
+        ...
+
+
+@dataclass
+class CodeStream:
+    """Extracts a fenced code block from a token stream.
+
+    Chunks are scanned line by line and every line is looked at once. The
+    first ```lang block is returned by `feed` as soon as its closing fence
+    arrives. A block in another language is only used if the stream ends
+    without a matching one, like `parse_code` does.
+
+    As in `parse_code`, an opening fence may follow other text on its line.
+    `parse_code` runs a block to the last ``` of the whole text, which a
+    stream cannot know in advance, so here a block ends at the first line
+    ending with ```. Both give the same code unless the code itself contains
+    a line ending with ```.
+
+    Attributes:
+        lang: The language of the wanted block.
+    """
+
+    lang: str = "python"
+    _buffer: str = field(init=False, default="")
+    _pos: int = field(init=False, default=0)
+    _block: Optional[list] = field(init=False, default=None)
+    _block_lang: str = field(init=False, default="")
+    _fallback: Optional[str] = field(init=False, default=None)
+
+    def feed(self, chunk: str) -> Optional[str]:
+        self._buffer += chunk
+        while (end := self._buffer.find("\n", self._pos)) >= 0:
+            line = self._buffer[self._pos : end]
+            self._pos = end + 1
+            code = self._line(line)
+            if code is not None:
+                return code
+        return None
+
+    def finish(self) -> str:
+        # 最后一行可能没有换行符
+        code = self._line(self._buffer[self._pos :])
+        self._pos = len(self._buffer)
+        if code is not None:
+            return code
+        if self._block is not None:
+            logger.warning(
+                "code in code block not end with ```, we add it automatically."
+            )
+            code = self._code()
+            if self._block_lang.startswith(self.lang) or self._fallback is None:
+                return code
+        if self._fallback is not None:
+            logger.warning(f"parse_code: {self.lang} not match following text.")
+            return self._fallback
+        raise Exception(f"no code block in following text:\n{self._buffer}")
+
+    def _code(self) -> str:
+        # 和 parse_code 一样，保留第一行代码的缩进
+        return "\n".join(self._block or []).lstrip("\r\n").rstrip()
+
+    def _line(self, line: str) -> Optional[str]:
+        if self._block is None:
+            start = line.find("```")
+            if start >= 0:
+                # 语言名之后同一行里剩下的内容属于代码
+                lang, _, rest = line[start + 3 :].lstrip().partition(" ")
+                self._block = [rest] if rest.strip() else []
+                self._block_lang = lang.strip()
+            return None
+        if not line.rstrip().endswith("```"):
+            self._block.append(line)
+            return None
+        # 结束标记前面可能还有最后一行代码
+        self._block.append(line.rstrip()[:-3])
+        code = self._code()
+        self._block = None
+        if self._block_lang.startswith(self.lang):
+            return code
+        if self._fallback is None:
+            self._fallback = code
+        return None
+
+
+@dataclass
+class JsonStream:
+    """Extracts the first JSON object or array from a token stream.
+
+    Brackets are matched outside of strings while the chunks arrive, so
+    `feed` returns the value as soon as its outermost bracket is closed;
+    text before and after it is ignored. If the stream ends first, `finish`
+    repairs what was received with `parse_json`.
+    """
+
+    _buffer: str = field(init=False, default="")
+    _pos: int = field(init=False, default=0)
+    _start: int = field(init=False, default=-1)
+    _depth: int = field(init=False, default=0)
+    _in_string: bool = field(init=False, default=False)
+    _escape: bool = field(init=False, default=False)
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        self._buffer += chunk
+        for i in range(self._pos, len(self._buffer)):
+            char = self._buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = self._start >= 0
+            elif char in "{[":
+                if self._start < 0:
+                    self._start = i
+                self._depth += 1
+            elif char in "}]" and self._start >= 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._pos = i + 1
+                    return parse_json(self._buffer[self._start : i + 1])
+        self._pos = len(self._buffer)
+        return None
+
+    def finish(self) -> Any:
+        if self._start < 0:
+            raise json.JSONDecodeError("no JSON in stream", self._buffer, 0)
+        return parse_json(self._buffer[self._start :])
+
+
+def parse_stream(chunks: Iterable[str], parser: StreamParser[R]) -> R:
+    """Feeds a token stream to `parser` and stops it once the value is complete.
+
+    When the stream is a generator it is closed as soon as the parser has its
+    value, which cancels the rest of the generation.
+
+    Args:
+        chunks: The token stream of a response.
+        parser: A `CodeStream` or `JsonStream`.
+
+    Returns:
+        The parsed value.
+    """
+    try:
+        for chunk in chunks:
+            result = parser.feed(chunk)
+            if result is not None:
+                return result
+        return parser.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass
+import threading
+import time
+
+from loguru import logger
+
+
+@dataclass
+class TokenBucket:
+    """A thread-safe token bucket.
+
+    Attributes:
+        rate: The tokens added per second.
+        capacity: The maximum tokens the bucket holds, which is also the
+            largest burst allowed.
+    """
+
+    rate: float
+    capacity: float
+
+    def __post_init__(self):
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(rate=limit / 60, capacity=limit)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Takes `tokens` from the bucket, blocking until they are available.
+
+        Requests larger than the capacity are clamped to it, so they wait for
+        a full bucket instead of forever.
+
+        Returns:
+            The seconds spent waiting.
+        """
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            # 先记账再等待，后来的请求会排在后面
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            logger.debug(f"Token bucket exhausted, sleep {wait:.1f}s.")
+            time.sleep(wait)
+        return wait
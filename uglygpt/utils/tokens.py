@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from functools import lru_cache
+from typing import Any, List, Optional
+import re
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+
+
+@lru_cache(maxsize=16)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)  # type: ignore
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")  # type: ignore
+
+
+def model_name(model: Any) -> Optional[str]:
+    """Returns the provider model name of a `uglychain.Model`, if it has one."""
+    value = getattr(model, "value", None)
+    if isinstance(value, tuple) and len(value) > 1:
+        return value[1].get("model")
+    return None
+
+
+def context_size(model: Any) -> Optional[int]:
+    """Returns the context window of a `uglychain.Model`, if it is known."""
+    value = getattr(model, "value", None)
+    if isinstance(value, tuple) and len(value) > 1:
+        return value[1].get("MAX_TOKENS")
+    return None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Counts the tokens of a text.
+
+    With `tiktoken` installed and a model name given, the model's tokenizer
+    is used. Otherwise the count is estimated: CJK characters take about one
+    token each, other text about four characters per token.
+
+    Args:
+        text: The text to measure.
+        model: The provider model name, e.g. `gpt-3.5-turbo`.
+
+    Returns:
+        The number of tokens.
+    """
+    if tiktoken is not None and model:
+        return len(_encoding(model).encode(text, disallowed_special=()))
+    cjk = len(CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def split_tokens(text: str, limit: int, model: Optional[str] = None) -> List[str]:
+    """Splits a text into chunks of at most `limit` tokens.
+
+    Chunks break between paragraphs where possible, and between lines or
+    characters only when a single paragraph is too long.
+
+    Args:
+        text: The text to split.
+        limit: The maximum number of tokens of a chunk.
+        model: The provider model name used to count tokens.
+
+    Returns:
+        The chunks, in order.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for piece in _pieces(text, limit, model):
+        tokens = count_tokens(piece, model)
+        if current and size + tokens > limit:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _pieces(text: str, limit: int, model: Optional[str]):
+    for paragraph in text.split("\n\n"):
+        if count_tokens(paragraph, model) <= limit:
+            yield paragraph
+            continue
+        for line in paragraph.split("\n"):
+            while count_tokens(line, model) > limit:
+                # 一行都放不下时按字符比例硬切
+                cut = max(1, len(line) * limit // count_tokens(line, model))
+                yield line[:cut]
+                line = line[cut:]
+            yield line
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import functools
+import json
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO, TypeVar
+
+from loguru import logger
+
+from .config import config
+from .file import File
+
+
+@dataclass
+class Span:
+    """A timed operation with attributes, in the OpenTelemetry data model."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str = ""
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start: int = field(default_factory=time.time_ns)
+    end: int = 0
+    error: str = ""
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, value: float = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start,
+            "endTimeUnixNano": self.end,
+            "durationMs": round((self.end - self.start) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error}
+            if self.error
+            else {"code": "OK"},
+        }
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass
+class Tracer:
+    """Records spans as JSON lines, one finished span per line.
+
+    Spans nest through a context variable: a span opened inside another one
+    becomes its child and shares its trace. Work submitted to a thread pool
+    should run in `contextvars.copy_context()` to keep its parent. With no
+    `file` set, spans are still handed to the caller but nothing is written.
+
+    Attributes:
+        file: The JSON lines file the spans are appended to.
+    """
+
+    file: str = config.trace_file
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._out: Optional[TextIO] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are written anywhere, i.e. worth computing attributes for."""
+        return bool(self.file)
+
+    def trace(self, name: str) -> Callable[[F], F]:
+        """Decorates a function to run inside a span called `name`."""
+
+        def decorator(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return wrapper  # type: ignore
+
+        return decorator
+
+    def set(self, key: str, value: Any) -> None:
+        """Sets an attribute on the current span, if there is one."""
+        span = _current.get()
+        if span is not None:
+            span.set(key, value)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        parent = _current.get()
+        span = Span(
+            name,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else "",
+            attributes=attributes,
+        )
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end = time.time_ns()
+            self._export(span)
+
+    def _export(self, span: Span) -> None:
+        if not self.file:
+            return
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                if self._out is None:
+                    path = File.to_path(self.file)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    self._out = path.open("a", encoding="utf-8")
+                self._out.write(line + "\n")
+                self._out.flush()
+            except OSError as e:
+                # 追踪失败不应影响主流程
+                logger.warning(f"Failed to write trace: {e}")
+
+
+tracer = Tracer()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+import asyncio
+from dataclasses import dataclass, field
+import threading
+from typing import Any, Optional
+
+
+@dataclass
+class AsyncWorker:
+    """A mixin that adds an awaitable `arun` to a worker.
+
+    Put it first among the worker's bases. The LLM clients are blocking, so
+    `arun` runs `run` in the event loop's default executor. Many workers can
+    then be awaited together with `asyncio.gather`, and each call can have a
+    timeout. Calls on the same worker are serialized, because its chain keeps
+    per-call state.
+
+    Attributes:
+        timeout: The default timeout of `arun` in seconds, None for no limit.
+    """
+
+    timeout: Optional[float] = None
+    _run_lock: threading.Lock = field(
+        init=False, repr=False, default_factory=threading.Lock
+    )
+
+    async def arun(self, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Awaits `run(*args, **kwargs)`.
+
+        Cancelling the task, or hitting the timeout, returns control to the
+        event loop at once. A request that is already in flight still
+        finishes in the background, and its result is discarded.
+
+        Args:
+            timeout: Overrides `self.timeout` for this call.
+
+        Returns:
+            The result of `run`.
+
+        Raises:
+            asyncio.TimeoutError: If `run` does not finish in time.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        return await asyncio.wait_for(
+            asyncio.to_thread(self._locked_run, *args, **kwargs), timeout
+        )
+
+    def _locked_run(self, *args, **kwargs) -> Any:
+        with self._run_lock:
+            return self.run(*args, **kwargs)  # type: ignore
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from dataclasses import dataclass, field
+from hashlib import sha256
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from pydantic import BaseModel
+from uglychain import MapChain
+
+from uglygpt.utils import (
+    Database,
+    File,
+    Span,
+    config,
+    count_tokens,
+    model_name,
+    tracer,
+)
+
+
+@dataclass
+class LLMCache:
+    """A content-addressed, size-bounded cache of LLM responses.
+
+    Entries are keyed by a hash of everything that determines the response,
+    so the same prompt is answered from the cache whichever repo, file or
+    worker it comes from. Entries expire after `ttl_days`, and the least
+    recently used ones are evicted beyond `max_entries`.
+    """
+
+    file: str = config.llm_cache
+    max_entries: int = 10000
+    ttl_days: float = 30
+    hits: int = field(init=False, default=0)
+    misses: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        File.to_path(self.file).parent.mkdir(parents=True, exist_ok=True)
+        self.db = Database(str(File.to_path(self.file)))
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed)"
+        )
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        text = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, keys: List[str]) -> Dict[str, str]:
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ", ".join("?" for _ in keys)
+        rows = self.db.execute(
+            f"SELECT key, value FROM llm_cache WHERE key IN ({placeholders}) and created > ?",
+            [*keys, now - self.ttl_days * 86400],
+        )
+        if rows:
+            self.db.executemany(
+                "UPDATE llm_cache SET accessed = ? WHERE key = ?",
+                [(now, key) for key, _ in rows],
+            )
+        self.hits += len(rows)
+        self.misses += len(keys) - len(rows)
+        return dict(rows)
+
+    def set(self, data: Dict[str, str]) -> None:
+        if not data:
+            return
+        now = time.time()
+        with self.db.transaction():
+            self.db.executemany(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in data.items()],
+            )
+            # 超出容量时淘汰最久未使用的条目
+            self.db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                [self.max_entries],
+            )
+
+
+@dataclass
+class CachedWorker:
+    """A mixin that answers a worker's `_ask` from an `LLMCache`.
+
+    Put it before the worker base class. The cache key covers the model, the
+    role, the prompt template and the rendered inputs; for a `MapChain` every
+    mapped item is cached on its own and only the misses reach the LLM.
+    """
+
+    cache: Optional[LLMCache] = None
+
+    def _ask(self, *args, **kwargs) -> Any:
+        with tracer.span(
+            "llm.ask",
+            worker=type(self).__name__,
+            model=self.model.name,  # type: ignore
+        ) as span:
+            # 没有缓存也不记录用量时，参数原样交给 LLM
+            if self.cache is None and not tracer.enabled:
+                return super()._ask(*args, **kwargs)  # type: ignore
+            if args:
+                if len(args) > 1 or kwargs:
+                    # LLM 只接受单个位置参数，其他组合交给它自己校验
+                    return super()._ask(*args, **kwargs)  # type: ignore
+                kwargs = {self.llm.input_keys[0]: args[0]}  # type: ignore
+            if isinstance(self.llm, MapChain):
+                return self._ask_map(kwargs, span)
+            key = self._cache_key(kwargs) if self.cache else ""
+            cached = self.cache.get([key]) if self.cache else {}
+            span.set("items", 1)
+            span.set("cache_hits", len(cached))
+            if key in cached:
+                return self._loads(cached[key])
+            response = super()._ask(**kwargs)  # type: ignore
+            self._trace_tokens(span, [kwargs], [response])
+            if self.cache:
+                self.cache.set({key: self._dumps(response)})
+            return response
+
+    def _ask_map(self, kwargs: Dict[str, Any], span: Span) -> List[Any]:
+        map_keys = self.llm.map_keys  # type: ignore
+        num = len(kwargs[map_keys[0]])
+        items = [
+            {k: v[i] if k in map_keys else v for k, v in kwargs.items()}
+            for i in range(num)
+        ]
+        if self.cache:
+            keys = [self._cache_key(item) for item in items]
+            cached = self.cache.get(list(set(keys)))
+        else:
+            keys = [str(i) for i in range(num)]
+            cached = {}
+        # 同一批里重复的输入只问一次
+        misses: Dict[str, int] = {}
+        for i, key in enumerate(keys):
+            if key not in cached:
+                misses.setdefault(key, i)
+        logger.debug(f"LLM cache: {num - len(misses)} hits, {len(misses)} misses.")
+        span.set("items", num)
+        span.set("cache_hits", num - len(misses))
+        answers: Dict[str, Any] = {k: self._loads(v) for k, v in cached.items()}
+        if misses:
+            indexes = list(misses.values())
+            response = super()._ask(  # type: ignore
+                **{
+                    k: [v[i] for i in indexes] if k in map_keys else v
+                    for k, v in kwargs.items()
+                }
+            )
+            answers.update(zip(misses, response))
+            self._trace_tokens(span, [items[i] for i in indexes], response)
+            if self.cache:
+                self.cache.set(
+                    {
+                        key: self._dumps(answers[key])
+                        for key in misses
+                        if answers[key] != "Error"
+                    }
+                )
+        return [answers[key] for key in keys]
+
+    def _trace_tokens(
+        self, span: Span, inputs: List[Dict[str, Any]], responses: List[Any]
+    ) -> None:
+        if not tracer.enabled:
+            return
+        # 接口不返回用量，按提示词和回复的长度估算
+        name = model_name(self.model)
+        role = self.role or ""  # type: ignore
+        prompts = [role + self.llm.prompt.format(**item) for item in inputs]  # type: ignore
+        span.add("prompt_tokens", sum(count_tokens(p, name) for p in prompts))
+        span.add(
+            "completion_tokens",
+            sum(count_tokens(str(self._dumps(r)), name) for r in responses),
+        )
+
+    def _cache_key(self, inputs: Dict[str, Any]) -> str:
+        assert self.cache
+        return self.cache.key(
+            self.model.name,  # type: ignore
+            self.role,  # type: ignore
+            self.prompt,  # type: ignore
+            inputs,
+        )
+
+    def _dumps(self, response: Any) -> str:
+        if isinstance(response, BaseModel):
+            return response.model_dump_json()
+        return response
+
+    def _loads(self, value: str) -> Any:
+        response_model = getattr(self.llm, "response_model", None)
+        if response_model:
+            return response_model.model_validate_json(value)
+        return value
@@ -1,6 +1,21 @@
-from .code_writer import CodeWriter
-from .code_reviewer import CodeReviewer
-from .code_rewriter import CodeRewriter
-from .test_writer import TestWriter
+from typing import TYPE_CHECKING
+
+from uglygpt.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .code_writer import CodeWriter
+    from .code_reviewer import CodeReviewer
+    from .code_rewriter import CodeRewriter
+    from .test_writer import TestWriter
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "CodeWriter": ".code_writer",
+        "CodeReviewer": ".code_reviewer",
+        "CodeRewriter": ".code_rewriter",
+        "TestWriter": ".test_writer",
+    },
+)
 
 __all__ = ["CodeWriter", "CodeReviewer", "CodeRewriter", "TestWriter"]
@@ -5,6 +5,9 @@ from dataclasses import dataclass
 
 from uglychain.worker.developer import Developer
 
+from uglygpt.worker.async_worker import AsyncWorker
+from uglygpt.worker.cache import CachedWorker
+
 ROLE = """
 假设你是一名经验丰富的软件工程师，你的主要任务是审查并优化代码。你需要确保代码符合PEP8标准，设计优雅且模块化，易于阅读和维护，并且是用Python 3.11（或其他编程语言）编写的。具体要求如下：
 - 基于`Context`和`Code`，按照下面的检查清单，提供最多5条关键、清晰、简洁和具体的代码修改建议：
@@ -33,7 +36,7 @@ PROMPT_TEMPLATE = """
 
 
 @dataclass
-class CodeReviewer(Developer):
+class CodeReviewer(AsyncWorker, CachedWorker, Developer):
     role: str = ROLE
     prompt: str = PROMPT_TEMPLATE
     name: str = "代码审查者"
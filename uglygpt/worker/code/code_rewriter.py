@@ -5,6 +5,9 @@ from dataclasses import dataclass
 
 from uglychain.worker.developer import Developer
 
+from uglygpt.worker.async_worker import AsyncWorker
+from uglygpt.worker.cache import CachedWorker
+
 ROLE = """
 假设你是一名经验丰富的Python开发者。你的任务是修复一段Python 3.11代码，使其符合PEP8规范，且代码应优雅、易于阅读和维护。具体要求如下：
 - 根据给定的`Context`和`Extra`信息，你需要改进`Code`。注意，你只需要返回代码形式。你的代码将成为整个项目的一部分，因此需要确保你的代码是完整的、可靠的、并且可以重用。
@@ -27,7 +30,7 @@ PROMPT_TEMPLATE = """
 
 
 @dataclass
-class CodeRewriter(Developer):
+class CodeRewriter(AsyncWorker, CachedWorker, Developer):
     role: str = ROLE
     prompt: str = PROMPT_TEMPLATE
     name: str = "代码改进者"
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 
 from uglychain.worker.developer import Developer
 
+from uglygpt.worker.async_worker import AsyncWorker
+from uglygpt.worker.cache import CachedWorker
+
 ROLE = """
 假设你是一名高级Python开发者。你的任务是编写一段符合PEP8规范的、优雅的、易于阅读和维护的Python 3.11代码，具体要求如下：
 - 根据用户的需求，你需要实现一个完整的代码文件。请注意，你的代码将成为整个项目的一部分，因此需要确保你的代码是完整的、可靠的、并且可以重用。
@@ -18,6 +21,6 @@ ROLE = """
 
 
 @dataclass
-class CodeWriter(Developer):
+class CodeWriter(AsyncWorker, CachedWorker, Developer):
     role: str = ROLE
     name: str = "代码开发者"
@@ -5,6 +5,8 @@ from dataclasses import dataclass
 
 from uglychain.worker.developer import Developer
 
+from uglygpt.worker.async_worker import AsyncWorker
+
 ROLE = """
 假设你是一名经验丰富的QA工程师，你的主要任务是为Python 3.11设计、开发和执行符合PEP8规范、结构良好、可维护的测试用例和脚本。你需要通过系统化的测试来确保整个项目的产品质量。具体要求如下：
 - 根据`Context`，你需要开发一个全面的测试套件，充分覆盖正在审查的代码文件`Code`的所有相关方面。你的测试套件将是整个项目QA的一部分，所以请开发完整、强大和可重用的测试用例。
@@ -35,7 +37,7 @@ PROMPT_TEMPLATE = """
 
 
 @dataclass
-class TestWriter(Developer):
+class TestWriter(AsyncWorker, Developer):
     role: str = ROLE
     prompt: str = PROMPT_TEMPLATE
     name: str = "测试用例编写者"
@@ -1,4 +1,19 @@
-from .summarizer import ReadmeSummarizer
-from .category import Category
+from typing import TYPE_CHECKING
 
-__all__ = ["ReadmeSummarizer", "Category"]
+from uglygpt.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .summarizer import ReadmeSummarizer
+    from .category import Category
+    from .classifier import LocalClassifier
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "ReadmeSummarizer": ".summarizer",
+        "Category": ".category",
+        "LocalClassifier": ".classifier",
+    },
+)
+
+__all__ = ["ReadmeSummarizer", "Category", "LocalClassifier"]
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, TypeVar, Generic, cast
+from typing import List, Dict, TypeVar, Generic, Optional, cast
 from enum import Enum, unique
 
 from loguru import logger
@@ -8,6 +8,11 @@ from uglychain.worker.base import BaseWorker
 from uglychain.storage import Storage, SQLiteStorage
 from uglychain import MapChain
 
+from uglygpt.utils import TokenBucket, count_tokens, tracer, transaction
+from uglygpt.worker.async_worker import AsyncWorker
+from uglygpt.worker.cache import CachedWorker
+from .classifier import LocalClassifier
+
 
 T = TypeVar("T", bound=Storage)
 
@@ -22,6 +27,16 @@ PROMPT = """
 项目的介绍：
 {description}
 """
+BATCH_ROLE = (
+    ROLE
+    + """
+每次会提供多个项目，每个项目前都有编号。请为每一个项目给出分类，并在结果中用 `index` 标明对应的项目编号，不要遗漏任何项目。
+"""
+)
+BATCH_PROMPT = """
+各个项目的介绍：
+{descriptions}
+"""
 
 
 @unique
@@ -38,11 +53,84 @@ class CategoryDetail(BaseModel):
     category: Cate = Field(..., description="具体的类别名，例如: 前端")
 
 
+class CategoryItem(CategoryDetail):
+    index: int = Field(..., description="项目的编号")
+
+
+class CategoryList(BaseModel):
+    items: List[CategoryItem] = Field(..., description="每个项目的分类结果")
+
+
 @dataclass
-class Category(BaseWorker, Generic[T]):
+class BatchCategory(CachedWorker, BaseWorker):
+    role: str = field(init=False, default=BATCH_ROLE)
+    prompt: str = field(init=False, default=BATCH_PROMPT)
+    batch_size: int = 10
+
+    def __post_init__(self):
+        self.llm = MapChain(
+            self.prompt,
+            self.model,
+            self.role,
+            CategoryList,
+            map_keys=["descriptions"],
+        )
+
+    def run(self, description_list: List[str]) -> List[Optional[CategoryDetail]]:
+        """Classifies the descriptions, `batch_size` of them per request.
+
+        A batch whose reply is not a complete, valid list is split in half and
+        asked again, down to single items.
+        """
+        results: List[Optional[CategoryDetail]] = [None] * len(description_list)
+        pending = [
+            list(range(i, min(i + self.batch_size, len(description_list))))
+            for i in range(0, len(description_list), self.batch_size)
+        ]
+        while pending:
+            packed = [
+                "\n\n".join(
+                    f"### 项目 {n}\n{description_list[i]}"
+                    for n, i in enumerate(indexes, 1)
+                )
+                for indexes in pending
+            ]
+            response = self._ask(descriptions=packed)
+            retry = []
+            for indexes, reply in zip(pending, response):
+                items = self._unpack(reply, len(indexes))
+                if items is not None:
+                    for i, item in zip(indexes, items):
+                        results[i] = item
+                elif len(indexes) > 1:
+                    half = len(indexes) // 2
+                    logger.warning(f"Batch of {len(indexes)} failed, split it.")
+                    retry.extend([indexes[:half], indexes[half:]])
+            pending = retry
+        return results
+
+    @staticmethod
+    def _unpack(reply, size: int) -> Optional[List[CategoryDetail]]:
+        if not isinstance(reply, CategoryList):
+            return None
+        items = {item.index: item for item in reply.items}
+        if set(items) != set(range(1, size + 1)):
+            return None
+        return [
+            CategoryDetail(reason=items[n].reason, category=items[n].category)
+            for n in range(1, size + 1)
+        ]
+
+
+@dataclass
+class Category(AsyncWorker, CachedWorker, BaseWorker, Generic[T]):
     role: str = field(init=False, default=ROLE)
     prompt: str = field(init=False, default=PROMPT)
     storage: T = field(default_factory=SQLiteStorage)  # type: ignore
+    budget: Optional[TokenBucket] = None
+    batch_size: int = 0
+    classifier: Optional[LocalClassifier] = None
+    llm_labels: Optional[Storage] = None
 
     def __post_init__(self):
         self.llm = MapChain(
@@ -52,8 +140,30 @@ class Category(BaseWorker, Generic[T]):
             CategoryDetail,
             map_keys=["description"],
         )
+        # 多个项目合并到一个请求里，共用一份 ROLE
+        if self.batch_size > 1:
+            self.batcher = BatchCategory(
+                model=self.model, cache=self.cache, batch_size=self.batch_size
+            )
+
+    def fit(self, data: Dict[str, str]) -> None:
+        """Trains the local classifier on the LLM-assigned categories of `data`.
+
+        Only `llm_labels` are used: training on the classifier's own
+        predictions would reinforce its mistakes and skew the calibration.
+        """
+        if self.classifier is None:
+            return
+        labels = (
+            cast(Dict, self.llm_labels.load(list(data.keys())))
+            if self.llm_labels
+            else {}
+        )
+        self.classifier.fit(data, labels)
 
+    @tracer.trace("category.run")
     def run(self, names: List[str], data: Dict[str, str]):
+        tracer.set("repos", len(names))
         logger.info("Running Category...")
         _datas = cast(Dict, self.storage.load(names))
         skip_names = set(_datas.keys())
@@ -61,26 +171,54 @@ class Category(BaseWorker, Generic[T]):
 
         new_names = []
         description_list = []
+        local = {}
         for name in names:
             if name in skip_names or name not in needin_names:
                 logger.debug(f"Skip {name}")
                 continue
+            # 本地分类器有把握的项目不再询问 LLM
+            if self.classifier and (label := self.classifier.predict(data[name])):
+                local[name] = label
+                continue
             new_names.append(name)
             description_list.append(data[name])
-
-        response = self._ask(description=description_list)
+        if self.classifier:
+            logger.info(
+                f"LocalClassifier: {len(local)} classified locally, "
+                f"hit rate {self.classifier.hit_rate:.0%}."
+            )
+
+        response = []
+        # 全部由本地分类器完成时不需要请求 LLM
+        if description_list:
+            if self.budget:
+                # 批量模式下每个请求只带一份 BATCH_ROLE
+                requests = len(description_list)
+                worker = self
+                if self.batch_size > 1:
+                    requests = -(-requests // self.batch_size)
+                    worker = self.batcher
+                self.budget.acquire(
+                    requests * count_tokens(worker.role + worker.prompt)
+                    + sum(count_tokens(d) for d in description_list)
+                )
+            if self.batch_size > 1:
+                response = self.batcher.run(description_list)
+            else:
+                response = self._ask(description=description_list)
         result = {
             k: v.category.value
             for k, v in zip(new_names, response)
             if isinstance(v, CategoryDetail)
         }
-        self.storage.save(result)
+        with transaction(self.storage):
+            # 只有 LLM 给出的分类才能作为本地分类器的训练数据
+            if self.llm_labels:
+                self.llm_labels.save(result)
+            result.update(local)
+            self.storage.save(result)
         _datas.update(result)
-
-        category_dict = {}
-        _ = [
-            category_dict.setdefault(category, []).append(name)
-            for name, category in _datas.items()
-        ]
-
-        return category_dict
+        tracer.set("local", len(local))
+        tracer.set("llm", len(description_list))
+        tracer.set("categorized", len(result))
+        return _datas
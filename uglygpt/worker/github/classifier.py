@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*-coding:utf-8-*-
+
+from collections import Counter
+from dataclasses import dataclass, field
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+TOKEN = re.compile(r"[a-z][a-z0-9+#]*|[一-鿿]+")
+
+Vector = Dict[str, float]
+
+
+def _tokens(text: str) -> List[str]:
+    tokens = []
+    for word in TOKEN.findall(text.lower()):
+        if "一" <= word[0] <= "鿿":
+            # 中文没有分词，用相邻两个字作为词
+            tokens.extend(word[i : i + 2] for i in range(max(1, len(word) - 1)))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _normalize(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    return {k: v / norm for k, v in vector.items()} if norm else vector
+
+
+@dataclass
+class LocalClassifier:
+    """A CPU-only TF-IDF nearest-centroid text classifier.
+
+    It is trained on the labels the LLM already produced. The confidence of a
+    prediction is the cosine-similarity margin between the best and the
+    second best centroid, and `fit` calibrates the threshold on a held-out
+    fifth of the data so that predictions above it reach `target_accuracy`.
+
+    Attributes:
+        target_accuracy: The accuracy required from local predictions.
+        min_samples: The fewest examples a label needs to get a centroid.
+        threshold: The calibrated confidence threshold, `inf` until a
+            threshold reaching `target_accuracy` is found.
+    """
+
+    target_accuracy: float = 0.95
+    min_samples: int = 5
+    threshold: float = field(init=False, default=math.inf)
+    total: int = field(init=False, default=0)
+    hits: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        self._idf: Dict[str, float] = {}
+        self._centroids: Dict[str, Vector] = {}
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.total if self.total else 0.0
+
+    def fit(self, texts: Dict[str, str], labels: Dict[str, str]) -> None:
+        """Trains on the texts that have a label and calibrates the threshold.
+
+        Args:
+            texts: The texts to learn from, keyed by name.
+            labels: The known label of each name.
+        """
+        names = sorted(name for name in texts if name in labels)
+        holdout = names[::5]
+        train = [name for i, name in enumerate(names) if i % 5]
+        self._train(texts, labels, train)
+        scored = []
+        for name in holdout:
+            prediction = self._predict(texts[name])
+            if prediction:
+                scored.append((prediction[1], prediction[0] == labels[name]))
+        self.threshold = self._calibrate(scored)
+        self._train(texts, labels, names)
+        coverage = sum(1 for margin, _ in scored if margin >= self.threshold)
+        logger.info(
+            f"LocalClassifier trained on {len(names)} samples, threshold "
+            f"{self.threshold:.3f} covers {coverage}/{len(scored)} of the holdout."
+        )
+
+    def predict(self, text: str) -> Optional[str]:
+        """Returns the label of `text`, or None if the prediction is not confident."""
+        self.total += 1
+        prediction = self._predict(text)
+        if prediction is None or prediction[1] < self.threshold:
+            return None
+        self.hits += 1
+        return prediction[0]
+
+    def _train(self, texts: Dict[str, str], labels: Dict[str, str], names: List[str]):
+        documents = {name: Counter(_tokens(texts[name])) for name in names}
+        df = Counter(token for counts in documents.values() for token in counts)
+        self._idf = {
+            token: math.log((1 + len(names)) / (1 + n)) + 1 for token, n in df.items()
+        }
+        sums: Dict[str, Counter] = {}
+        sizes = Counter(labels[name] for name in names)
+        for name, counts in documents.items():
+            if sizes[labels[name]] < self.min_samples:
+                continue
+            sums.setdefault(labels[name], Counter()).update(self._vectorize(counts))
+        self._centroids = {label: _normalize(dict(v)) for label, v in sums.items()}
+
+    def _vectorize(self, counts: Counter) -> Vector:
+        return _normalize(
+            {
+                token: (1 + math.log(n)) * self._idf[token]
+                for token, n in counts.items()
+                if token in self._idf
+            }
+        )
+
+    def _predict(self, text: str) -> Optional[Tuple[str, float]]:
+        if len(self._centroids) < 2:
+            return None
+        vector = self._vectorize(Counter(_tokens(text)))
+        scores = sorted(
+            (
+                (sum(w * centroid.get(t, 0.0) for t, w in vector.items()), label)
+                for label, centroid in self._centroids.items()
+            ),
+            reverse=True,
+        )
+        return scores[0][1], scores[0][0] - scores[1][0]
+
+    def _calibrate(self, scored: List[Tuple[float, bool]]) -> float:
+        # 从最自信的预测开始往下放宽，找到仍满足准确率要求的最低阈值
+        threshold = math.inf
+        correct = 0
+        for n, (margin, right) in enumerate(sorted(scored, reverse=True), 1):
+            correct += right
+            if n >= self.min_samples and correct / n >= self.target_accuracy:
+                threshold = margin
+        return threshold
@@ -1,67 +1,118 @@
 #!/usr/bin/env python3
-from dataclasses import dataclass, field
-from typing import cast
+from dataclasses import dataclass
+from hashlib import sha256
+import json
+from typing import List, Optional
 
 from loguru import logger
-from llama_index.core import Document, VectorStoreIndex, Settings
+from llama_index.core import VectorStoreIndex, Settings
 from llama_index.core.query_engine import CitationQueryEngine
+from llama_index.core.schema import TextNode
 import nest_asyncio
 
-from uglychain import Model, Retriever, StorageRetriever
-from uglychain.storage import Storage, SQLiteStorage
+# 导入 uglychain 时会把 Settings.embed_model 设为配置里的 embedding 模型
+from uglychain import Model
 from uglychain.llm.llama_index import LlamaIndexLLM
 
+from uglygpt.utils import Database, tracer
+
 import sys
 import logging
+from functools import cache
+
 
-logging.basicConfig(stream=sys.stdout, level=logging.INFO)
-logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
+@cache
+def _setup_llama_index():
+    """Configures llama-index once, when the first index is built."""
+    nest_asyncio.apply()
+    Settings.llm = LlamaIndexLLM(model=Model.GPT3_TURBO)
 
-nest_asyncio.apply()
-Settings.llm = LlamaIndexLLM(model=Model.GPT3_TURBO)
+
+def _digest(text: str) -> str:
+    return sha256(text.encode()).hexdigest()
 
 
 @dataclass
 class GithubIndex:
+    """Semantic search over the README summaries of the trending repos.
+
+    The vectors live next to the summaries, in the `ReadmeEmbedding` table,
+    and the hash of the summary each one was computed from in `IndexedReadme`.
+    `update()` only embeds the summaries that are new or whose hash changed,
+    and upserts their rows; nothing already stored is rewritten. `search()`
+    builds an in-memory vector index from the stored vectors, so only the
+    query itself is embedded.
+
+    Attributes:
+        filename: The database the summaries are stored in.
+        batch_size: The summaries sent to the embedding model per request.
+        db: An open `Database` of `filename` to share, if any.
+    """
+
     filename: str = "data/github/github.db"
-    model: Model = Model.DEFAULT
-    summarizer_db: Storage = field(init=False)
-    retriever: StorageRetriever = field(init=False)
+    batch_size: int = 64
+    db: Optional[Database] = None
 
     def __post_init__(self):
-        self.summarizer_db = SQLiteStorage(self.filename, "ReadmeSummarizer", 30)
-        self.retriever = Retriever.LlamaIndex.getStorage(
-            persist_dir="./data/github/repos"
-        )
-        if self._need_update:
-            self._update()
+        _setup_llama_index()
+        if self.db is None:
+            self.db = Database(self.filename)
+        # 与 GithubTrending 中总结的保存期限一致
+        self.summaries = self.db.table("ReadmeSummarizer", 365)
+        self.hashes = self.db.table("IndexedReadme", 365)
+        self.embeddings = self.db.table("ReadmeEmbedding", 365)
+
+    def update(self) -> int:
+        """Embeds the new and changed summaries, returns how many there were."""
+        assert self.db
+        with tracer.span("index.update") as span:
+            summaries = self.summaries.load()
+            digests = {key: _digest(text) for key, text in summaries.items()}
+            known = self.hashes.load(list(digests))
+            changed = [
+                key for key, digest in digests.items() if known.get(key) != digest
+            ]
+            logger.info(
+                f"Embedding {len(changed)} of {len(digests)} README summaries..."
+            )
+            for i in range(0, len(changed), self.batch_size):
+                keys = changed[i : i + self.batch_size]
+                vectors = Settings.embed_model.get_text_embedding_batch(
+                    [summaries[key] for key in keys]
+                )
+                # 向量和哈希在同一个事务里写入，中途失败时已完成的批次不会重做
+                with self.db.transaction():
+                    self.embeddings.save(
+                        {
+                            key: json.dumps(vector)
+                            for key, vector in zip(keys, vectors)
+                        }
+                    )
+                    self.hashes.save({key: digests[key] for key in keys})
+            span.set("summaries", len(digests))
+            span.set("embedded", len(changed))
+            return len(changed)
 
     def search(self, query: str):
-        index = cast(VectorStoreIndex, self.retriever.index)  # type: ignore
+        index = VectorStoreIndex(self._nodes())
         query_engine = CitationQueryEngine.from_args(index, similarity_top_k=5)
-        # query_engine = index.as_query_engine(llm=LlamaIndexLLM(Model.GPT3_TURBO), similarity_top_k=8) # type: ignore
         return query_engine.query(query)
-        # self.retriever.get(query, "refine")
-
-    @property
-    def _need_update(self):
-        return False
 
-    def _update(self):
-        doc_chunks = []
-        data = self.summarizer_db.load(condition="timestamp = date('now','localtime')")
-        for key, value in data.items():
-            doc = Document(text=value, doc_id=key)
-            doc_chunks.append(doc)
-        index = cast(VectorStoreIndex, self.retriever.index)  # type: ignore
-        logger.info("refresh_ref_docs")
-        index.refresh_ref_docs(doc_chunks)
-        self.retriever.storage.save(index)
-        logger.info("refresh_ref_docs done")
+    def _nodes(self) -> List[TextNode]:
+        summaries = self.summaries.load()
+        # 已过期的总结不再参与搜索
+        vectors = self.embeddings.load(list(summaries))
+        return [
+            TextNode(text=summaries[key], id_=key, embedding=json.loads(vector))
+            for key, vector in vectors.items()
+        ]
 
 
 if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+    logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
     index = GithubIndex()
+    index.update()
     result = index.search("给我介绍几个关于使用大模型自动写代码的项目吧！")
     # logger.debug(result.source_nodes)
     logger.info(result)
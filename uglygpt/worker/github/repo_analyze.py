@@ -13,38 +13,46 @@ from uglychain import Model
 from uglygpt.utils.config import config
 import nest_asyncio
 
-nest_asyncio.apply()
-logging.basicConfig(stream=sys.stdout, level=logging.INFO)
-logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
 
+def load_index(owner: str, repo: str, branch: str = "master"):
+    """Loads the index of a repo, building and persisting it the first time."""
+    # check if storage already exists
+    persist_dir = "./data/github/" + owner + "/" + repo
+    if not os.path.exists(persist_dir):
+        documents = GithubRepositoryReader(
+            github_token=config.github_token,
+            owner=owner,
+            repo=repo,
+            use_parser=False,
+            verbose=False,
+            ignore_directories=["examples"],
+        ).load_data(branch=branch)
+        index = SummaryIndex.from_documents(
+            documents, show_progress=True, build_tree=True
+        )
+        # store it for later
+        index.storage_context.persist(persist_dir=persist_dir)
+    else:
+        # load the existing index
+        storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+        index = load_index_from_storage(storage_context)
+    return index
 
-# load the documents and create the index
-owner = "rjmacarthy"
-repo = "twinny"
-branch = "master"
-# check if storage already exists
-PERSIST_DIR = "./data/github/" + owner + "/" + repo
-if not os.path.exists(PERSIST_DIR):
-    documents = GithubRepositoryReader(
-        github_token=config.github_token,
-        owner=owner,
-        repo=repo,
-        use_parser=False,
-        verbose=False,
-        ignore_directories=["examples"],
-    ).load_data(branch=branch)
-    index = SummaryIndex.from_documents(documents, show_progress=True, build_tree=True)
-    # store it for later
-    index.storage_context.persist(persist_dir=PERSIST_DIR)
-else:
-    # load the existing index
-    storage_context = StorageContext.from_defaults(persist_dir=PERSIST_DIR)
-    index = load_index_from_storage(storage_context)
 
-query_engine = index.as_query_engine(
-    llm=LlamaIndexLLM(model=Model.YI),
-    retriever_mode="all_leaf",
-    response_mode="tree_summarize",
-)
-response = query_engine.query("这个项目是如何实现补全功能的？给我看一看具体的代码。")
-print(response)
+def analyze(owner: str, repo: str, question: str, branch: str = "master"):
+    nest_asyncio.apply()
+    query_engine = load_index(owner, repo, branch).as_query_engine(
+        llm=LlamaIndexLLM(model=Model.YI),
+        retriever_mode="all_leaf",
+        response_mode="tree_summarize",
+    )
+    return query_engine.query(question)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(stream=sys.stdout, level=logging.INFO)
+    logging.getLogger().addHandler(logging.StreamHandler(stream=sys.stdout))
+    response = analyze(
+        "rjmacarthy", "twinny", "这个项目是如何实现补全功能的？给我看一看具体的代码。"
+    )
+    print(response)
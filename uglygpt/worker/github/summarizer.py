@@ -1,11 +1,25 @@
 from dataclasses import dataclass, field
-from typing import List, TypeVar, Generic, cast, Dict
+from typing import List, TypeVar, Generic, Optional, cast, Dict
+import threading
+
 from loguru import logger
 from uglychain.worker.base import BaseWorker
 from uglychain.storage import Storage, SQLiteStorage
 from uglychain import MapChain
 
 from uglygpt.utilities import GithubAPI
+from uglygpt.utils import (
+    TokenBucket,
+    clean_markdown,
+    context_size,
+    count_tokens,
+    model_name,
+    split_tokens,
+    tracer,
+    transaction,
+)
+from uglygpt.worker.async_worker import AsyncWorker
+from uglygpt.worker.cache import CachedWorker
 
 T = TypeVar("T", bound=Storage)
 
@@ -20,13 +34,40 @@ PROMPT = """
 ## READMD.md
 {readme}
 """
+CHUNK_ROLE = """
+我在此提供一个 Github 项目 Readme 文件中的一个片段。请提取出这个片段中关于项目核心价值和主要功能的信息，忽略安装步骤、使用说明等细节，以200字以内的简洁语言输出，**注意请使用中文**。
+"""
+CHUNK_PROMPT = """
+下面是 Readme 文件的片段：
+{chunk}
+"""
+# 片段总结拼起来仍然超长时，最多再归并的轮数
+REDUCE_ROUNDS = 3
 
 
 @dataclass
-class ReadmeSummarizer(BaseWorker, Generic[T]):
+class ReadmeChunkSummarizer(CachedWorker, BaseWorker):
+    role: str = field(init=False, default=CHUNK_ROLE)
+    prompt: str = field(init=False, default=CHUNK_PROMPT)
+
+    def __post_init__(self):
+        self.llm = MapChain(self.prompt, self.model, self.role, map_keys=["chunk"])
+
+    def run(self, chunks: List[str]) -> List[str]:
+        logger.info(f"Summarizing {len(chunks)} README chunks...")
+        return self._ask(chunk=chunks)
+
+
+@dataclass
+class ReadmeSummarizer(AsyncWorker, CachedWorker, BaseWorker, Generic[T]):
     role: str = field(init=False, default=ROLE)
     prompt: str = field(init=False, default=PROMPT)
     storage: T = field(default_factory=SQLiteStorage)  # type: ignore
+    versions: Optional[Storage] = None
+    concurrency: int = 8
+    block: int = 8
+    budget: Optional[TokenBucket] = None
+    max_tokens: int = 0
 
     def __post_init__(self):
         self.llm = MapChain(
@@ -35,33 +76,152 @@ class ReadmeSummarizer(BaseWorker, Generic[T]):
             self.role,
             map_keys=["readme", "description"],
         )
+        self.chunker = ReadmeChunkSummarizer(model=self.model, cache=self.cache)
+        # README 的 token 上限，未指定时取模型上下文的一半
+        self._model_name = model_name(self.model)
+        if not self.max_tokens:
+            self.max_tokens = (context_size(self.model) or 16000) // 2
+        # MapChain 不是线程安全的，多个 block 同时运行时需要排队调用
+        self._lock = threading.Lock()
 
+    @tracer.trace("summarizer.run")
     def run(self, names: List[str], description_list: List[str]):
+        tracer.set("repos", len(names))
         logger.info("Running ReadmeSummarizer...")
         _datas = cast(Dict, self.storage.load(names))
-        new_names = []
-        new_readme_list = []
-        new_description_list = []
         skip_names = set(_datas.keys())
+        # 有版本记录时，已总结的项目也要检查 README 是否有变化（未变化时只是一次 304）
+        versions = cast(Dict, self.versions.load(names)) if self.versions else {}
+        descriptions = {}
         for name, description in zip(names, description_list):
-            if name in skip_names:
+            if name in skip_names and self.versions is None:
                 logger.debug(f"Skip {name}")
                 continue
-            readme = GithubAPI.fetch_readme(name)
+            descriptions[name] = description
+
+        # README 并发下载，每凑满一个 block 就送去总结，下载和总结同时进行
+        result = {}
+        unchanged = {}
+        shas = {}
+        new_names = []
+        new_readme_list = []
+        # 已有版本记录的 README 先比较 sha，没有变化时不下载正文
+        known = {
+            name: versions[name]
+            for name in descriptions
+            if name in skip_names and name in versions
+        }
+        for name, readme, sha in GithubAPI.fetch_readmes(
+            descriptions, self.concurrency, known=known
+        ):
+            if name in skip_names and sha is not None:
+                if versions.get(name, sha) == sha:
+                    logger.debug(f"Skip {name}")
+                    unchanged[name] = sha
+                    continue
+                logger.info(f"README of {name} changed, summarize again.")
             if readme is None:
                 logger.warning(f"Skip {name}")
                 continue
-            if len(readme) > 35000:
-                readme = readme[:35000]
+            shas[name] = sha
             new_names.append(name)
             new_readme_list.append(readme)
-            new_description_list.append(description)
-        response = self._ask(readme=new_readme_list, description=new_description_list)
+            if len(new_names) >= self.block:
+                result.update(
+                    self._summarize(new_names, new_readme_list, descriptions, shas)
+                )
+                new_names, new_readme_list = [], []
+        if new_names:
+            result.update(
+                self._summarize(new_names, new_readme_list, descriptions, shas)
+            )
+        if self.versions:
+            self.versions.save(
+                {k: v for k, v in unchanged.items() if k not in versions}
+            )
+        tracer.set("summarized", len(result))
+        tracer.set("unchanged", len(unchanged))
+        return result
+
+    def _summarize(
+        self,
+        names: List[str],
+        readme_list: List[str],
+        descriptions: Dict[str, str],
+        shas: Dict[str, str],
+    ) -> Dict[str, str]:
+        description_list = [descriptions[name] for name in names]
+        with self._lock:
+            readme_list = self._condense(readme_list)
+            if self.budget:
+                self.budget.acquire(
+                    sum(
+                        count_tokens(self.role + self.prompt + readme + description)
+                        for readme, description in zip(readme_list, description_list)
+                    )
+                )
+            response = self._ask(readme=readme_list, description=description_list)
         result = {}
-        for k, v in zip(new_names, response):
+        for k, v in zip(names, response):
             if v == "Error":
                 logger.error(f"Error when summarizing {k}")
                 continue
             result[k] = v
-        self.storage.save(result)
+        # 总结和对应的 README 版本一起提交
+        with transaction(self.storage):
+            self.storage.save(result)
+            if self.versions:
+                self.versions.save({k: shas[k] for k in result})
         return result
+
+    def _condense(self, readme_list: List[str]) -> List[str]:
+        """Cleans READMEs and map-reduces the ones over the token budget.
+
+        Images, badges, HTML and code blocks are stripped first. A README that
+        is still over `max_tokens` is split into chunks that are summarized
+        on their own, and the joined chunk summaries replace it. While the
+        joined summaries are still over budget they are split and summarized
+        again, up to `REDUCE_ROUNDS` times; what is left over is truncated.
+        """
+        readme_list = [clean_markdown(readme) for readme in readme_list]
+        for _ in range(REDUCE_ROUNDS):
+            over = [
+                i
+                for i, readme in enumerate(readme_list)
+                if count_tokens(readme, self._model_name) > self.max_tokens
+            ]
+            if not over:
+                return readme_list
+            for i, summary in self._reduce([readme_list[i] for i in over]).items():
+                readme_list[over[i]] = summary
+        return [self._truncate(readme) for readme in readme_list]
+
+    def _reduce(self, readme_list: List[str]) -> Dict[int, str]:
+        """Summarizes the chunks of each README and joins them back."""
+        chunks = []
+        owners = []
+        for i, readme in enumerate(readme_list):
+            parts = split_tokens(readme, self.max_tokens, self._model_name)
+            chunks.extend(parts)
+            owners.extend([i] * len(parts))
+        if self.budget:
+            self.budget.acquire(
+                sum(count_tokens(self.chunker.role + chunk) for chunk in chunks)
+            )
+        condensed: Dict[int, List[str]] = {i: [] for i in range(len(readme_list))}
+        for i, summary in zip(owners, self.chunker.run(chunks)):
+            # 失败的片段直接丢弃，原文放回去只会让 README 再次超长
+            if summary == "Error":
+                logger.warning("Error when summarizing a README chunk.")
+                continue
+            condensed[i].append(summary)
+        return {
+            # 所有片段都失败时只能截断原文
+            i: "\n\n".join(parts) if parts else self._truncate(readme_list[i])
+            for i, parts in condensed.items()
+        }
+
+    def _truncate(self, readme: str) -> str:
+        if count_tokens(readme, self._model_name) <= self.max_tokens:
+            return readme
+        return split_tokens(readme, self.max_tokens, self._model_name)[0]
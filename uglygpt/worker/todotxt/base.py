@@ -8,6 +8,9 @@ from uglychain import LLM
 from uglychain.storage import FileStorage
 
 from uglychain.worker.base import BaseWorker
+
+from uglygpt.worker.async_worker import AsyncWorker
+
 from .schema import TodoItem, TodoItemResponse
 
 ROLE = """You are an AI Assistant that helps you to manage your todo list.
@@ -31,7 +34,7 @@ Help me to translate it into an todo item in todotxt format."""
 
 
 @dataclass
-class Todo(BaseWorker):
+class Todo(AsyncWorker, BaseWorker):
     prompt: str = "{context}"
     role: str = ROLE.format(today=datetime.now().strftime("%Y-%m-%d"))
     file_path: str = "data/todotxt/test.txt"
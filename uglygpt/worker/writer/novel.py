@@ -10,6 +10,8 @@ from loguru import logger
 from uglychain import ReduceChain, Model, Retriever, BaseWorker, StorageRetriever
 from uglychain.storage import DillStorage
 
+from uglygpt.worker.async_worker import AsyncWorker
+
 
 ROLE = """
 我需要你帮我写一部小说。现在我给你一个400字的记忆（简短的总结），你应该用它来储存已经写过的关键内容，这样你就可以跟踪很长的上下文。每次，我会给你你当前的记忆（前面故事的简短总结。你应该用它来储存已经写过的关键内容，这样你就可以跟踪很长的上下文），之前写的段落，以及关于下一段要写什么的指示。
@@ -49,7 +51,7 @@ PROMPT_TEMPLATE = """
 
 
 @dataclass
-class Novel(BaseWorker):
+class Novel(AsyncWorker, BaseWorker):
     filename: str = "resource/local/novel.txt"
     model: Model = Model.YI
     prompt: str = PROMPT_TEMPLATE
@@ -1,3 +1,10 @@
-from .plotter import Novel
+from typing import TYPE_CHECKING
 
-__all__ = ["Novel"]
\ No newline at end of file
+from uglygpt.utils.lazy import lazy_exports
+
+if TYPE_CHECKING:
+    from .plotter import Novel
+
+__getattr__ = lazy_exports(__name__, {"Novel": ".plotter"})
+
+__all__ = ["Novel"]
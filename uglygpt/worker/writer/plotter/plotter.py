@@ -4,6 +4,8 @@ from loguru import logger
 
 from uglychain import LLM, Model, BaseWorker
 
+from uglygpt.worker.async_worker import AsyncWorker
+
 from .prompt import (
     SYNOPSIS,
     TITLE,
@@ -22,7 +24,7 @@ ROLE = "你是一名通俗小说家，你需要按照指示一步一步的写出
 
 
 @dataclass
-class Novel(BaseWorker):
+class Novel(AsyncWorker, BaseWorker):
     model: Model = Model.DEFAULT
     role: str = ROLE
     llm: LLM = field(init=False)